@@ -0,0 +1,315 @@
+import operator
+from array import array
+
+from Matrix import Matrix, view_position
+
+class ArrayMatrix(Matrix):
+    """
+    Describes a 2D matrix of floats stored in one contiguous array('d')
+    buffer, row after row. Each entry takes 8 bytes instead of a pointer
+    plus a boxed float, and a row is a run of consecutive memory, so row
+    operations touch one block of memory. Rows are read and written
+    through ArrayRow views of the buffer; NumPy is not needed.
+    """
+    __slots__ = ("buffer", "_num_cols")
+    def __init__(self, contents=None, num_cols=None):
+        """
+        CONTENTS may be a list of rows, another Matrix, or an array('d')
+        holding the entries row after row, in which case NUM_COLS must be
+        given. If contents is None, the matrix is created using user
+        input.
+
+        >>> mat = ArrayMatrix([[1, 2], [3, 4]])
+        >>> mat.buffer
+        array('d', [1.0, 2.0, 3.0, 4.0])
+        >>> mat[1][0]
+        3.0
+        >>> ArrayMatrix(array('d', range(6)), 3).column(2)
+        [2.0, 5.0]
+        """
+        if contents is None:
+            contents = Matrix().contents
+        elif isinstance(contents, Matrix):
+            num_cols = contents.num_cols()
+            contents = [contents[i] for i in range(len(contents))]
+        if isinstance(contents, array):
+            assert num_cols is not None, "num_cols is required for a flat buffer."
+            self.buffer = array("d", contents)
+        else:
+            self.buffer = array("d")
+            for row in contents:
+                if num_cols is None:
+                    num_cols = len(row)
+                assert len(row) == num_cols, "All rows must have the same length."
+                self.buffer.extend(row)
+        if num_cols is None:
+            num_cols = 0
+        assert num_cols == 0 or len(self.buffer) % num_cols == 0, \
+            "The buffer does not hold a whole number of rows."
+        self._num_cols = num_cols
+        num_rows = len(self.buffer) // num_cols if num_cols else len(contents)
+        self.contents = [
+            ArrayRow(self.buffer, i * num_cols, num_cols) for i in range(num_rows)
+        ]
+    def num_cols(self):
+        """
+        Returns the number of columns in this matrix.
+        """
+        return self._num_cols
+    def _row(self, i):
+        """
+        Returns the (0-based) row I, which tells this matrix when it is
+        written to.
+        """
+        row = self.contents[i]
+        return ArrayRow(row.buffer, row.start, row.length, self)
+    def column(self, col):
+        """
+        Returns a list of the entries in the (0-based) column COL.
+
+        >>> ArrayMatrix([[1, 2, 3], [4, 5, 6]]).column(-1)
+        [3.0, 6.0]
+        """
+        if col < 0:
+            col += self._num_cols
+        assert 0 <= col < self._num_cols, "Column {} is out of range.".format(col)
+        return self.buffer[col::self._num_cols].tolist()
+    def transpose(self):
+        """
+        Returns the transpose of this matrix, built from one strided slice
+        of the buffer per column.
+
+        >>> ArrayMatrix([[1, 2, 3], [4, 5, 6]]).transpose().buffer.tolist()
+        [1.0, 4.0, 2.0, 5.0, 3.0, 6.0]
+        """
+        buffer, n = self.buffer, self._num_cols
+        out = array("d")
+        for j in range(n):
+            out.extend(buffer[j::n])
+        if not len(self):
+            return ArrayMatrix([[] for j in range(n)])
+        return ArrayMatrix(out, len(self))
+    def matvec(self, vector):
+        """
+        Returns the product of this matrix and the column VECTOR, as a list.
+
+        >>> ArrayMatrix([[1, 2], [3, 4]]).matvec([1, -1])
+        [-1.0, -1.0]
+        """
+        buffer, n = self.buffer, self._num_cols
+        assert len(vector) == n, "Expected {} entries, got {}.".format(n, len(vector))
+        vector = list(vector)
+        return [
+            sum(map(operator.mul, buffer[start:start + n], vector))
+            for start in range(0, len(buffer), n)
+        ] if n else [0.0] * len(self)
+    def append(self, row):
+        """
+        Adds ROW, a list of entries, to the bottom of this matrix. The
+        buffer grows in place, so existing row views stay valid.
+
+        This is a side effect; return type is None.
+
+        >>> mat = ArrayMatrix([[1, 2]])
+        >>> mat.append([3, 4])
+        >>> mat.buffer.tolist()
+        [1.0, 2.0, 3.0, 4.0]
+        """
+        if not len(self):
+            self._num_cols = len(row)
+        assert len(row) == self._num_cols, \
+            "Expected {} entries, got {}.".format(self._num_cols, len(row))
+        self.contents.append(ArrayRow(self.buffer, len(self.buffer), self._num_cols))
+        self.buffer.extend(row)
+        self._changed()
+    def replace(self, row_to_mutate, mutator_row, scale):
+        """
+        Replaces the content of the ROW_TO_MUTATE with its current values plus
+        the values in the MUTATOR_ROW times SCALE.
+
+        This is a side effect; return type is None.
+
+        >>> mat = ArrayMatrix([[1, 2, 3], [4, 5, 6]])
+        >>> mat.replace(2, 1, -4)
+        >>> mat.buffer.tolist()
+        [1.0, 2.0, 3.0, 0.0, -3.0, -6.0]
+        """
+        assert min(row_to_mutate, mutator_row) > 0
+        n = self._num_cols
+        target = slice((row_to_mutate - 1) * n, row_to_mutate * n)
+        source = self.buffer[(mutator_row - 1) * n:mutator_row * n]
+        self.buffer[target] = array("d", [
+            entry + scale * other
+            for entry, other in zip(self.buffer[target], source)
+        ])
+        self._changed()
+    def interchange(self, row_a, row_b):
+        """
+        Swaps the entries of ROW_A with those of ROW_B.
+
+        This is a side effect; return type is None.
+
+        >>> mat = ArrayMatrix([[1, 2], [3, 4]])
+        >>> mat.interchange(1, 2)
+        >>> mat.buffer.tolist()
+        [3.0, 4.0, 1.0, 2.0]
+        """
+        assert min(row_a, row_b) > 0
+        if row_a == row_b: return
+        n = self._num_cols
+        a = slice((row_a - 1) * n, row_a * n)
+        b = slice((row_b - 1) * n, row_b * n)
+        self.buffer[a], self.buffer[b] = self.buffer[b], self.buffer[a]
+        self._changed()
+    def scale(self, row_to_mutate, scale):
+        """
+        Replaces the content of the ROW_TO_MUTATE with its current values
+        times SCALE.
+
+        This is a side effect; return type is None.
+
+        >>> mat = ArrayMatrix([[1, 2], [3, 4]])
+        >>> mat.scale(2, 0.5)
+        >>> mat.buffer.tolist()
+        [1.0, 2.0, 1.5, 2.0]
+        """
+        n = self._num_cols
+        target = slice((row_to_mutate - 1) * n, row_to_mutate * n)
+        self.buffer[target] = array("d", [entry * scale for entry in self.buffer[target]])
+        self._changed()
+    def copy(self):
+        """
+        Returns a copy of this matrix.
+        """
+        if not self._num_cols:
+            return ArrayMatrix([[] for row in self.contents])
+        return ArrayMatrix(self.buffer, self._num_cols)
+    def _reduce(self, accuracy=2, steps=None):
+        """
+        Reduces this matrix to row echelon form in place, like
+        Matrix._reduce.
+
+        Returns the (0-based) pivot column of each pivot row, in order.
+        """
+        assert accuracy is not None, \
+            "ArrayMatrix stores floats; use Matrix for exact arithmetic."
+        return super()._reduce(accuracy, steps)
+    def _pivot_candidate(self, pivot_row, col):
+        """
+        Returns the (0-based) index of the row at or below PIVOT_ROW whose
+        entry in column COL has the largest magnitude, like
+        Matrix._pivot_candidate, reading the column as one strided slice.
+        """
+        entries = self.buffer[pivot_row * self._num_cols + col::self._num_cols]
+        return pivot_row + max(
+            range(len(entries)), key=lambda i: (abs(entries[i]), entries[i] < 0)
+        )
+    def _eliminate_below(self, pivot_row, col):
+        """
+        Subtracts multiples of the row at (0-based) index PIVOT_ROW from
+        every row below it so that they have zeros in column COL, like
+        Matrix._eliminate_below, working on the buffer directly.
+
+        Returns the multipliers used, one per row below PIVOT_ROW.
+        """
+        buffer, n = self.buffer, self._num_cols
+        pivot_tail = buffer[pivot_row * n + col:(pivot_row + 1) * n]
+        pivot = pivot_tail[0]
+        factors = []
+        for start in range((pivot_row + 1) * n + col, len(buffer), n):
+            factor = buffer[start] / pivot
+            factors.append(factor)
+            if factor:
+                tail = slice(start, start + len(pivot_tail))
+                buffer[tail] = array("d", [
+                    entry - factor * pivot_entry
+                    for entry, pivot_entry in zip(buffer[tail], pivot_tail)
+                ])
+                buffer[start] = 0
+        return factors
+    def _back_substitute(self, pivots, column, solution=None):
+        """
+        Returns a solution of the echelon-form system whose coefficients
+        are this matrix and whose constants are COLUMN, like
+        Matrix._back_substitute, reading each pivot row's tail straight
+        from the buffer.
+        """
+        buffer, n = self.buffer, self._num_cols
+        solution = [0.0] * n if solution is None else list(solution)
+        for row, col in reversed(pivots):
+            start = row * n
+            tail = buffer[start + col + 1:start + n]
+            solution[col] = (
+                column[row] - sum(map(operator.mul, tail, solution[col + 1:]))
+            ) / buffer[start + col]
+        return solution
+
+class ArrayRow:
+    """
+    Describes one row of an ArrayMatrix: a run of LENGTH consecutive
+    entries of a flat array('d') buffer, which can be read and written
+    like a list without being copied.
+    """
+    __slots__ = ("buffer", "start", "length", "matrix")
+    def __init__(self, buffer, start, length, matrix=None):
+        """
+        Creates a view of the LENGTH entries of BUFFER beginning at the
+        (0-based) position START.
+        MATRIX: The matrix whose _changed is called after every write
+        through this row, if any
+        """
+        self.buffer = buffer
+        self.start = start
+        self.length = length
+        self.matrix = matrix
+    def __len__(self):
+        return self.length
+    def __iter__(self):
+        return iter(self.buffer[self.start:self.start + self.length])
+    def __repr__(self):
+        return repr(self[:])
+    def __eq__(self, other):
+        return list(self) == list(other)
+    def __getitem__(self, key):
+        """
+        Returns entry KEY of this row, or a list of the entries in KEY if
+        it is a slice.
+
+        >>> ArrayMatrix([[1, 2, 3]])[0][1:]
+        [2.0, 3.0]
+        >>> ArrayMatrix([[1, 2, 3], [4, 5, 6]])[1][::-1]
+        [6.0, 5.0, 4.0]
+        """
+        index = view_position(key, self.start, self.length)
+        if isinstance(index, range):
+            if index.step == 1:
+                return self.buffer[index.start:index.stop].tolist()
+            return [self.buffer[i] for i in index]
+        return self.buffer[index]
+    def __setitem__(self, key, value):
+        """
+        Sets entry KEY of this row to VALUE, or, if KEY is a slice, sets
+        the entries in it to those of the sequence VALUE, which must have
+        the same length.
+
+        >>> mat = ArrayMatrix([[1, 2, 3]])
+        >>> mat[0][1:] = [5, 6]
+        >>> mat.buffer.tolist()
+        [1.0, 5.0, 6.0]
+        >>> mat[0][::-2] = [7, 8]
+        >>> mat.buffer.tolist()
+        [8.0, 5.0, 7.0]
+        """
+        index = view_position(key, self.start, self.length)
+        if isinstance(index, range):
+            value = array("d", value)
+            assert len(value) == len(index), "A row cannot change length."
+            if index.step == 1:
+                self.buffer[index.start:index.stop] = value
+            else:
+                for i, entry in zip(index, value):
+                    self.buffer[i] = entry
+        else:
+            self.buffer[index] = value
+        if self.matrix is not None:
+            self.matrix._changed()
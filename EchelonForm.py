@@ -0,0 +1,164 @@
+import bisect
+from fractions import Fraction
+
+from Matrix import Matrix, is_negligible, is_zero_constant
+
+class EchelonForm:
+    """
+    Describes a row echelon form of a matrix that is built up one row at
+    a time. Each new row is reduced against the pivot rows already kept,
+    which takes time in proportion to the size of the echelon form, and
+    the rank is known after every row. Read as an augmented matrix, it
+    also tells whether the system is consistent and how many solutions
+    it has; an entry left in the last column only makes a pivot if
+    is_zero_constant does not hold for it, as in LUDecomposition.
+    """
+    def __init__(self, num_cols, accuracy=2):
+        """
+        Creates the echelon form of a matrix with NUM_COLS columns and no
+        rows yet.
+        ACCURACY: Number of significant decimal places, or None to
+        reduce exactly with fractions
+        """
+        self.num_cols = num_cols
+        self.accuracy = accuracy
+        self.num_rows = 0
+        # The pivot rows in order of their (0-based) pivot columns
+        self.pivot_cols = []
+        self.rows = []
+    def append(self, row):
+        """
+        Adds ROW to the matrix and reduces it against the pivot rows.
+        Returns the (0-based) column of the new pivot it creates, or None
+        if the row depends on the rows before it.
+
+        As in Matrix.ref, the pivot in each column is the entry of largest
+        magnitude: if the reduced row has nothing left of a pivot column
+        and a larger entry in it than the pivot row, the two rows trade
+        places, and the old pivot row is reduced further instead.
+
+        >>> echelon = EchelonForm(2)
+        >>> echelon.append([0.5, 1]), echelon.append([2, 1])
+        (0, 1)
+        >>> echelon.rows
+        [[2, 1], [0.0, 0.75]]
+
+        >>> echelon = EchelonForm(3, None)
+        >>> echelon.append([0, 2, 4]), echelon.append([1, 1, 1]), echelon.append([1, 2, 3])
+        (1, 0, None)
+        >>> echelon.matrix().contents
+        [[Fraction(1, 1), Fraction(0, 1), Fraction(-1, 1)], [Fraction(0, 1), Fraction(2, 1), Fraction(4, 1)], [0, 0, 0]]
+        """
+        assert len(row) == self.num_cols, \
+            "Expected {} entries, got {}.".format(self.num_cols, len(row))
+        if self.accuracy is None:
+            row = [Fraction(entry) for entry in row]
+        else:
+            row = list(row)
+        self.num_rows += 1
+        for position, col in enumerate(self.pivot_cols):
+            pivot_row = self.rows[position]
+            if abs(row[col]) > abs(pivot_row[col]) and all(
+                    is_negligible(entry, self.accuracy) for entry in row[:col]
+                ):
+                self.rows[position], row = row, pivot_row
+                pivot_row = self.rows[position]
+            factor = row[col] / pivot_row[col]
+            if factor:
+                row[col:] = [
+                    entry - factor * pivot_entry
+                    for entry, pivot_entry in zip(row[col:], pivot_row[col:])
+                ]
+            row[col] = 0 * row[col]
+        for col, entry in enumerate(row):
+            if col == self.num_cols - 1:
+                # The constants column, read as in LUDecomposition
+                if not is_zero_constant(entry, self.accuracy):
+                    break
+            elif not is_negligible(entry, self.accuracy):
+                break
+            row[col] = 0 * entry
+        else:
+            return
+        position = bisect.bisect(self.pivot_cols, col)
+        self.pivot_cols.insert(position, col)
+        self.rows.insert(position, row)
+        return col
+    def rank(self):
+        """
+        Returns the rank of the matrix.
+        """
+        return len(self.pivot_cols)
+    def pivots(self):
+        """
+        Returns the (0-based) (row, col) positions of the pivots.
+        """
+        return list(enumerate(self.pivot_cols))
+    def matrix(self):
+        """
+        Returns a Matrix holding a copy of this echelon form, with a row of
+        zeros for every row that did not create a pivot.
+
+        >>> echelon = EchelonForm(2)
+        >>> echelon.append([1, 2])
+        0
+        >>> echelon.matrix()[0][0] = 99
+        >>> echelon.rows
+        [[1, 2]]
+        """
+        return Matrix([list(row) for row in self.rows] + [
+            [0] * self.num_cols for i in range(self.num_rows - self.rank())
+        ])
+    def is_consistent(self):
+        """
+        Returns whether the system with this augmented matrix has a
+        solution, that is, whether its last column has no pivot.
+        """
+        return not self.pivot_cols or self.pivot_cols[-1] != self.num_cols - 1
+    def num_solutions(self):
+        """
+        Returns the number of solutions of the system with this augmented
+        matrix: 0, 1, or positive infinity.
+
+        >>> echelon = EchelonForm(3)
+        >>> echelon.append([1, 1, 2]); echelon.num_solutions()
+        0
+        inf
+        >>> echelon.append([1, 2, 3]); echelon.num_solutions()
+        1
+        1
+        >>> echelon.append([2, 2, 5]); echelon.num_solutions()
+        2
+        0
+        >>> echelon = EchelonForm(3)
+        >>> echelon.append([1, 1, 2]); echelon.append([1, 1, 2.007])
+        0
+        >>> echelon.num_solutions()
+        inf
+        """
+        if not self.is_consistent():
+            return 0
+        if self.rank() < self.num_cols - 1:
+            return float("inf")
+        return 1
+    def solution(self):
+        """
+        Returns the unique solution of the system with this augmented
+        matrix as a tuple, or None if there is no unique solution.
+
+        >>> echelon = EchelonForm(3, None)
+        >>> echelon.append([1, 1, 2]); echelon.append([1, 2, 3])
+        0
+        1
+        >>> echelon.solution()
+        (Fraction(1, 1), Fraction(1, 1))
+        """
+        if self.num_solutions() != 1:
+            return
+        num_vars = self.num_cols - 1
+        solution = [0] * num_vars
+        for col, row in zip(reversed(self.pivot_cols), reversed(self.rows)):
+            solution[col] = (
+                row[-1] - sum(row[j] * solution[j] for j in range(col + 1, num_vars))
+            ) / row[col]
+        return tuple(solution)
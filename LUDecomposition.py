@@ -0,0 +1,173 @@
+from fractions import Fraction
+
+from Matrix import PivotIndex, is_zero_constant
+from formatting import roundall
+
+class LUDecomposition:
+    """
+    Describes a factorization PA = LU of a matrix A, where U is a row
+    echelon form of A and P and L are kept as the sequence of row
+    interchanges and replacements that produced U. The factorization is
+    computed once, after which any number of systems Ax = b can be
+    solved by substitution alone.
+    """
+    def __init__(self, matrix, accuracy=2):
+        """
+        Factors MATRIX, which is not modified.
+        ACCURACY: Number of significant decimal places, or None to
+        factor (and later solve) exactly with fractions
+
+        >>> from Matrix import Matrix
+        >>> lu = LUDecomposition(Matrix([[1, 1], [1, 2]]))
+        >>> lu.pivots
+        [(0, 0), (1, 1)]
+        >>> LUDecomposition(Matrix([[1, 1, 2], [2, 2, 4]])).pivot_index
+        PivotIndex([0], 3)
+        >>> lu.rank()
+        2
+        >>> LUDecomposition(Matrix([[1, 1], [1, 2]]), None).solve([1, 0])
+        (Fraction(2, 1), Fraction(-1, 1))
+        """
+        self.accuracy = accuracy
+        self.upper = matrix.copy()
+        self.steps = []
+        pivot_cols = self.upper._reduce(accuracy, self.steps)
+        self.pivot_index = PivotIndex(pivot_cols, self.upper.num_cols())
+        self.pivots = self.pivot_index.pivots()
+    def rank(self):
+        """
+        Returns the rank of the factored matrix.
+        """
+        return self.pivot_index.rank()
+    def num_cols(self):
+        """
+        Returns the number of columns (unknowns) of the factored matrix.
+        """
+        return self.upper.num_cols()
+    def transform(self, constants):
+        """
+        Returns L^-1 P b for the column of CONSTANTS b, that is, the
+        constants of the echelon-form system equivalent to Ax = b.
+        """
+        assert len(constants) == len(self.upper), \
+            "Expected {} constants, got {}.".format(len(self.upper), len(constants))
+        if self.accuracy is None:
+            constants = [Fraction(entry) for entry in constants]
+        return self.upper._apply_steps(self.steps, constants)
+    def num_solutions(self, constants):
+        """
+        Returns the number of solutions of Ax = b for the column of
+        CONSTANTS b: 0, 1, or positive infinity.
+
+        >>> from Matrix import Matrix
+        >>> lu = LUDecomposition(Matrix([[2, 1], [4, 2]]))
+        >>> lu.num_solutions([1, 1.25])
+        0
+        >>> lu.num_solutions([1, 2])
+        inf
+        >>> lu.num_solutions([1, 2.014]), lu.num_solutions([1, 2.03])
+        (inf, 0)
+        """
+        return self._count(self.transform(constants))
+    def solve(self, constants):
+        """
+        Returns the unique solution of Ax = b for the column of CONSTANTS
+        b as a tuple, or None if there is no unique solution.
+
+        >>> from Matrix import Matrix
+        >>> from formatting import roundall
+        >>> lu = LUDecomposition(Matrix([[1, 1, 0], [2, 1, 1], [1, -1, 3]]))
+        >>> roundall(lu.solve([3, 7, 8]))
+        (1, 2, 3)
+        >>> roundall(lu.solve([2, 5, 6]))
+        (1, 1, 2)
+        """
+        transformed = self.transform(constants)
+        if self._count(transformed) != 1:
+            return
+        return tuple(self.upper._back_substitute(self.pivots, transformed))
+    def general_solution(self, constants):
+        """
+        Returns every solution of Ax = b for the column of CONSTANTS b as a
+        pair (particular, basis): PARTICULAR is one solution, as a tuple,
+        and BASIS is a list of tuples spanning the null space of A, one
+        per free variable. The solutions are PARTICULAR plus any linear
+        combination of BASIS. Returns None if there is no solution.
+
+        >>> from Matrix import Matrix
+        >>> lu = LUDecomposition(Matrix([[1, 2, 1], [2, 4, 3]]), None)
+        >>> particular, basis = lu.general_solution([1, 3])
+        >>> particular
+        (Fraction(0, 1), Fraction(0, 1), Fraction(1, 1))
+        >>> basis
+        [(Fraction(-2, 1), Fraction(1, 1), Fraction(0, 1))]
+        >>> lu.general_solution([1, 3]) == (particular, basis)
+        True
+        """
+        transformed = self.transform(constants)
+        if self._count(transformed) == 0:
+            return
+        zero, one = (Fraction(0), Fraction(1)) if self.accuracy is None else (0, 1)
+        particular = tuple(self.upper._back_substitute(
+            self.pivots, transformed, [zero] * self.num_cols()
+        ))
+        zeros = [zero] * len(transformed)
+        basis = []
+        for free in self.pivot_index.free_columns:
+            solution = [zero] * self.num_cols()
+            solution[free] = one
+            basis.append(tuple(self.upper._back_substitute(self.pivots, zeros, solution)))
+        return particular, basis
+    def solve_many(self, constants):
+        """
+        Solves Ax = b for every column b of CONSTANTS, a matrix (or list of
+        rows) with one row per row of A. The recorded row operations are
+        applied to all of the columns in a single pass.
+
+        Returns one (num_solutions, solution) pair per column, where
+        solution is None unless num_solutions is 1.
+
+        >>> from Matrix import Matrix
+        >>> lu = LUDecomposition(Matrix([[1, 1], [2, 2]]))
+        >>> lu.solve_many([[2, 1], [4, 3]])
+        [(inf, None), (0, None)]
+        >>> lu = LUDecomposition(Matrix([[1, 1], [1, 2]]))
+        >>> [(count, roundall(sol)) for count, sol in lu.solve_many([[2, 3], [3, 5]])]
+        [(1, (1, 1)), (1, (1, 2))]
+        >>> import os, tempfile
+        >>> from MappedMatrix import MappedMatrix
+        >>> path = os.path.join(tempfile.mkdtemp(), "mat.npy")
+        >>> lu = LUDecomposition(MappedMatrix.from_matrix(path, [[1, 1], [1, 2]]))
+        >>> [(count, roundall(sol)) for count, sol in lu.solve_many([[2], [3]])]
+        [(1, (1, 1))]
+        """
+        assert len(constants) == len(self.upper), \
+            "Expected {} rows of constants, got {}.".format(len(self.upper), len(constants))
+        block = self.upper._in_memory([
+            [Fraction(entry) for entry in row] if self.accuracy is None else list(row)
+            for row in constants
+        ])
+        block._replay(self.steps)
+        results = []
+        for j in range(block.num_cols()):
+            transformed = block.column(j)
+            count = self._count(transformed)
+            results.append((
+                count,
+                tuple(self.upper._back_substitute(self.pivots, transformed))
+                if count == 1 else None
+            ))
+        return results
+    def _count(self, transformed):
+        """
+        Returns the number of solutions of the echelon-form system whose
+        constants are TRANSFORMED.
+        """
+        if not all(
+                is_zero_constant(entry, self.accuracy)
+                for entry in transformed[self.rank():]
+            ):
+            return 0
+        if self.pivot_index.free_columns:
+            return float("inf")
+        return 1
@@ -1,14 +1,26 @@
-from Matrix import Matrix, get_pivot_position
+from Matrix import Matrix, PivotIndex
+from EchelonForm import EchelonForm
+from LUDecomposition import LUDecomposition
 from formatting import round2, roundall
 
 class LinearSystem:
     """
     Describes a linear system of equations.
     """
-    def __init__(self, aug_matrix=None, decimal_places=2):
+    __slots__ = ("aug_matrix", "decimal_places", "solver", "_factors", "_echelon", "_guess")
+    def __init__(self, aug_matrix=None, decimal_places=2, solver=None):
         """
         Initializes this system based on its corresponding
-        augmented matrix.
+        augmented matrix. If DECIMAL_PLACES is None, the system is solved
+        exactly with fractions. Nothing is computed until it is needed.
+        If SOLVER, an IterativeSolver from the iterative module, is given,
+        square systems are solved by iteration instead of elimination;
+        see solve.
+
+        >>> LinearSystem(Matrix([[1, 1, 1], [1, 2, 0]]), None).solution()
+        (Fraction(2, 1), Fraction(-1, 1))
+        >>> LinearSystem(Matrix([[1, 1, 1], [1, 1.001, 1]]), None).num_solutions()
+        1
         """
         self.decimal_places = decimal_places
         if aug_matrix is None:
@@ -20,7 +32,23 @@ class LinearSystem:
                     break
         else:
             self.aug_matrix = aug_matrix
-        self.ref = self.aug_matrix.ref()
+        self.solver = solver
+        self._factors = None
+        self._echelon = None
+        self._guess = None
+    @property
+    def ref(self):
+        """
+        The row echelon form of the augmented matrix of this system. It is
+        computed on first use and remembered by the augmented matrix.
+
+        >>> print(LinearSystem(Matrix([[1, 1, 2], [2, 1, 3]])).ref)
+        2     1     3     
+        0     0.5   0.5   
+        """
+        if self._echelon is not None:
+            return self._echelon.matrix()
+        return self.aug_matrix.ref(self.decimal_places)
     def __str__(self, decimal_places=2):
         """
         Represents this linear system as a string.
@@ -47,41 +75,195 @@ class LinearSystem:
         >>> LinearSystem(Matrix([[1, 1, 1], [2, 1, 2]])).num_solutions()
         1
         """
-        if any(
-                all(round2(entry, self.decimal_places) == 0 for entry in row[:-1]) \
-                    and round2(row[-1], self.decimal_places) != 0
-                for row in self.ref
-            ):
-            return 0
-        num_tautologies = len([
-            row for row in self.ref
-            if all(round2(entry, self.decimal_places) == 0 for entry in row)
-        ])
-        num_constraints = len(self.ref) - num_tautologies
-        num_vars = len(self.ref[0][:-1]) if len(self.ref) > 0 else 0
-        if num_vars > num_constraints:
-            return float("inf")
-        else:
-            return 1
+        if self._echelon is not None:
+            return self._echelon.num_solutions()
+        return self.factorization().num_solutions(self.constants())
+    def rank(self):
+        """
+        Returns the rank of the coefficient matrix of this system.
+
+        >>> LinearSystem(Matrix([[1, 1, 1], [2, 2, 2]])).rank()
+        1
+        """
+        if self._echelon is not None:
+            return self._echelon.rank() - (not self._echelon.is_consistent())
+        return self.factorization().rank()
+    def pivot_index(self):
+        """
+        Returns the PivotIndex of the coefficient matrix of this system,
+        whose free columns are those of the free variables.
+
+        >>> LinearSystem(Matrix([[1, 1, 1], [2, 2, 2]])).pivot_index().free_columns
+        [1]
+        """
+        if self._echelon is not None:
+            num_vars = self._echelon.num_cols - 1
+            return PivotIndex(
+                [col for col in self._echelon.pivot_cols if col < num_vars], num_vars
+            )
+        return self.factorization().pivot_index
+    def is_consistent(self):
+        """
+        Returns whether this system has at least one solution.
+        """
+        return self.num_solutions() != 0
+    def append(self, row):
+        """
+        Adds the equation whose augmented row is ROW to this system. The
+        first call builds an echelon form of the system, and each call
+        reduces only the new row against its pivots, so num_solutions,
+        rank and solution stay up to date without eliminating again.
+
+        This is a side effect; return type is None.
+
+        >>> system = LinearSystem(Matrix([[1, 1, 2]]))
+        >>> system.append([1, 2, 3])
+        >>> system.num_solutions(), roundall(system.solution())
+        (1, (1, 1))
+        >>> system.append([2, 2, 5])
+        >>> system.num_solutions(), system.rank()
+        (0, 2)
+        >>> system = LinearSystem(Matrix([[1, 1, 2]]))
+        >>> system.append([1, 1, 2.007])
+        >>> system.num_solutions(), LinearSystem(Matrix([[1, 1, 2], [1, 1, 2.007]])).num_solutions()
+        (inf, inf)
+        """
+        if self._echelon is None:
+            self._echelon = EchelonForm(self.aug_matrix.num_cols(), self.decimal_places)
+            for i in range(len(self.aug_matrix)):
+                self._echelon.append(self.aug_matrix[i])
+        self.aug_matrix.append(row)
+        self._echelon.append(row)
+        self._factors = None
+    def coefficients(self):
+        """
+        Returns the coefficient matrix of this system, that is, its
+        augmented matrix without the last column.
+        """
+        return self.aug_matrix.submatrix(end_col=self.aug_matrix.num_cols() - 1)
+    def constants(self):
+        """
+        Returns the list of constants on the right-hand side of this
+        system, that is, the last column of its augmented matrix.
+        """
+        return self.aug_matrix.column(-1)
+    def factorization(self):
+        """
+        Returns the LU factorization of the coefficient matrix of this
+        system. It is computed on first use and reused afterwards.
+        """
+        if self._factors is None:
+            self._factors = LUDecomposition(
+                self.coefficients(), self.decimal_places
+            )
+        return self._factors
     def solution(self):
         """
         Returns the unique solution to this equation, if a unique 
-        solution exists.
+        solution exists. With a solver, an iterate is checked to be
+        unique with the factorization of the coefficients; use solve to
+        skip the check.
 
         >>> roundall(LinearSystem(Matrix([[1, 1, 2], [1, 2, 3]])).solution())
         (1, 1)
         >>> roundall(LinearSystem(Matrix([[1, 1, 0, 3], [2, 1, 1, 7], [1, -1, 3, 8]])).solution())
         (1, 2, 3)
         """
-        if self.num_solutions() != 1:
-            return
-        sols = dict()
-        for row in self.ref[::-1]:
-            pivot_pos = get_pivot_position(row, self.decimal_places)
-            sols[pivot_pos] = (
-                    row[-1] - sum(
-                        sols[j+1]*coeff 
-                        for j, coeff in list(enumerate(row))[pivot_pos:-1]
-                    )
-                ) / row[pivot_pos-1]
-        return tuple([sols[j+1] for j in range(len(sols))])
\ No newline at end of file
+        if self._echelon is not None:
+            return self._echelon.solution()
+        return self.solve(self.constants(), unique=True)
+    def general_solution(self):
+        """
+        Returns every solution of this system as a pair (particular,
+        basis), where PARTICULAR is one solution and BASIS spans the
+        solutions of the homogeneous system, one vector per free
+        variable; see LUDecomposition.general_solution. Returns None if
+        there is no solution.
+
+        >>> particular, basis = LinearSystem(Matrix([[1, 1, 2, 3]])).general_solution()
+        >>> roundall(particular), [roundall(vector) for vector in basis]
+        ((3, 0, 0), [(-1, 1, 0), (-2, 0, 1)])
+        """
+        return self.factorization().general_solution(self.constants())
+    def residual(self, solution=None):
+        """
+        Returns the residual b - A*x of SOLUTION x (by default, the unique
+        solution of this system) as a list, one entry per equation, as
+        the iterative solvers define it; every entry is close to zero for
+        a true solution.
+
+        >>> system = LinearSystem(Matrix([[1, 1, 2], [1, 2, 3]]))
+        >>> roundall(system.residual())
+        (0, 0)
+        >>> system.residual([1, 0])
+        [1, 2]
+        """
+        if solution is None:
+            solution = self.solution()
+            assert solution is not None, "This system has no unique solution."
+        products = self.coefficients().matvec(solution)
+        return [
+            constant - product for product, constant in zip(products, self.constants())
+        ]
+    def solve(self, constants, start=None, unique=False):
+        """
+        Returns the unique solution to the system with the same
+        coefficients as this one and the given column of CONSTANTS, if a
+        unique solution exists. Only substitution is done; the
+        factorization of the coefficients is shared between calls.
+
+        If this system has a solver and square coefficients, and is not
+        solved exactly, the solver iterates from START instead (by
+        default, the last solution it found for this system), using
+        only mat-vec products, and the coefficients are never factored.
+        If the iteration does not converge, the system is solved by
+        elimination after all. For singular coefficients a converged
+        iterate is only one of many solutions; if UNIQUE is true, it is
+        returned only if the factorization of the coefficients shows no
+        free variables, as solution does.
+
+        >>> system = LinearSystem(Matrix([[1, 1, 0, 3], [2, 1, 1, 7], [1, -1, 3, 8]]))
+        >>> roundall(system.solve([2, 5, 6]))
+        (1, 1, 2)
+        >>> roundall(system.solve([0, 0, 0]))
+        (0, 0, 0)
+        >>> from iterative import Jacobi
+        >>> system = LinearSystem(Matrix([[4, 1, 6], [2, 5, 12]]), solver=Jacobi())
+        >>> roundall(system.solution()), system.solver.iterations
+        ((1, 2), 21)
+        >>> roundall(system.solve([6, 12.5])), system.solver.iterations
+        ((0.97, 2.11), 17)
+        >>> system = LinearSystem(Matrix([[1, 2, 5], [3, 1, 5]]), solver=Jacobi())
+        >>> roundall(system.solution())
+        (1, 2)
+        >>> from iterative import GMRES
+        >>> system = LinearSystem(Matrix([[1, 1, 2], [1, 1, 2]]), solver=GMRES())
+        >>> roundall(system.solve([2, 2])), system._factors is None
+        ((1, 1), True)
+        >>> print(system.solve([2, 2], unique=True))
+        None
+        """
+        if self.solver is not None and self.decimal_places is not None \
+                and len(self.aug_matrix) == self.aug_matrix.num_cols() - 1:
+            solution, converged = self.solver.solve(
+                self.coefficients(), constants, self._guess if start is None else start
+            )
+            if converged and not (unique and self.factorization().pivot_index.free_columns):
+                self._guess = solution
+                return solution
+        return self.factorization().solve(constants)
+    def solve_many(self, constants):
+        """
+        Solves the systems with the same coefficients as this one for
+        every column of CONSTANTS, a matrix (or list of rows) with one row
+        per equation. The factorization of the coefficients is shared, and
+        all of the columns are reduced together.
+
+        Returns one (num_solutions, solution) pair per column, where
+        solution is None unless num_solutions is 1.
+
+        >>> system = LinearSystem(Matrix([[1, 1, 2], [1, 2, 3]]))
+        >>> [(count, roundall(sol)) for count, sol in system.solve_many(Matrix([[2, 0], [3, 1]]))]
+        [(1, (1, 1)), (1, (-1, 1))]
+        """
+        return self.factorization().solve_many(constants)
@@ -0,0 +1,253 @@
+import os
+import tempfile
+import weakref
+
+import numpy
+from numpy.lib.format import open_memmap
+
+from Matrix import PivotIndex
+from NumpyMatrix import NumpyMatrix
+
+class MappedMatrix(NumpyMatrix):
+    """
+    Describes a 2D matrix whose entries stay in a .npy file on disk and are
+    paged in through numpy.memmap. Copies, ref and rref stream the matrix
+    through memory in blocks, holding roughly MEMORY_CAP bytes of entries
+    at a time, so matrices larger than memory can be reduced.
+    """
+    def __init__(self, path, shape=None, memory_cap=64 * 2**20, executor=None):
+        """
+        Opens the .npy file at PATH for reading and writing. If SHAPE, a
+        pair (num_rows, num_cols), is given, a new file of zeros with that
+        shape is created at PATH instead.
+        MEMORY_CAP: Approximate number of bytes of entries that block
+        operations may hold in memory at once; it should be enough for a
+        few columns of the matrix.
+        EXECUTOR: Optional executor for parallel updates, as in NumpyMatrix
+
+        >>> import os, tempfile
+        >>> path = os.path.join(tempfile.mkdtemp(), "mat.npy")
+        >>> mat = MappedMatrix(path, (2, 3))
+        >>> mat.replace(1, 2, 1)
+        >>> MappedMatrix(path).contents.shape
+        (2, 3)
+        """
+        if shape is None:
+            self.contents = open_memmap(path, mode="r+")
+        else:
+            self.contents = open_memmap(path, mode="w+", dtype=float, shape=shape)
+        assert self.contents.ndim == 2, "{} does not hold a 2D array.".format(path)
+        self.path = path
+        self.memory_cap = memory_cap
+        self.executor = executor
+    @classmethod
+    def from_matrix(cls, path, matrix, memory_cap=64 * 2**20, executor=None):
+        """
+        Returns a new MappedMatrix at PATH holding the entries of MATRIX.
+
+        >>> import os, tempfile
+        >>> path = os.path.join(tempfile.mkdtemp(), "mat.npy")
+        >>> MappedMatrix.from_matrix(path, [[1, 2], [3, 4]]).contents.tolist()
+        [[1.0, 2.0], [3.0, 4.0]]
+        """
+        if not isinstance(matrix, MappedMatrix):
+            matrix = NumpyMatrix(matrix)
+        mat = cls(path, matrix.contents.shape, memory_cap, executor)
+        for start, stop in row_blocks(matrix.contents.shape, memory_cap):
+            mat.contents[start:stop] = matrix.contents[start:stop]
+        mat.contents.flush()
+        return mat
+    def _floats(self):
+        """
+        Returns the number of entries that fit in the memory cap.
+        """
+        return max(1, self.memory_cap // self.contents.itemsize)
+    def _new_path(self):
+        """
+        Returns the path of a new temporary .npy file next to this one.
+        """
+        handle, path = tempfile.mkstemp(
+            suffix=".npy", dir=os.path.dirname(os.path.abspath(self.path))
+        )
+        os.close(handle)
+        return path
+    def copy(self, path=None):
+        """
+        Returns a copy of this matrix, stored at PATH or, if PATH is None,
+        in a new temporary file next to this one. A temporary file is
+        deleted once the copy is no longer referenced.
+
+        >>> import os, tempfile
+        >>> directory = tempfile.mkdtemp()
+        >>> mat = MappedMatrix.from_matrix(os.path.join(directory, "mat.npy"), [[1]])
+        >>> copy = mat.copy()
+        >>> len(os.listdir(directory))
+        2
+        >>> del copy
+        >>> len(os.listdir(directory))
+        1
+        """
+        if path is not None:
+            return MappedMatrix.from_matrix(path, self, self.memory_cap, self.executor)
+        path = self._new_path()
+        mat = MappedMatrix.from_matrix(path, self, self.memory_cap, self.executor)
+        weakref.finalize(mat, os.remove, path)
+        return mat
+    def _in_memory(self, rows):
+        """
+        Returns a NumpyMatrix of ROWS, since a MappedMatrix can only be
+        made from a file.
+        """
+        return NumpyMatrix(rows, self.executor)
+    def append(self, row):
+        """
+        The file backing this matrix has a fixed shape, so rows cannot be
+        added.
+        """
+        raise TypeError("Cannot append rows to a MappedMatrix.")
+    def pivot_index(self, accuracy=2):
+        """
+        Returns the PivotIndex of the row echelon form of this matrix. Only
+        the index is remembered, not the row echelon form: ref and rref
+        write new files wherever they are asked to.
+        ACCURACY: Number of significant decimal places
+
+        >>> import os, tempfile
+        >>> directory = tempfile.mkdtemp()
+        >>> mat = MappedMatrix.from_matrix(os.path.join(directory, "mat.npy"), [[1, 2], [2, 4]])
+        >>> mat.rank(), mat.pivots(), len(os.listdir(directory))
+        (1, [(0, 0)], 1)
+        >>> mat[1, 1] = 5
+        >>> mat.rank()
+        2
+        """
+        return self._memoized(("pivot_index", accuracy), self._pivot_index, accuracy)
+    def _pivot_index(self, accuracy):
+        """
+        Computes the PivotIndex for pivot_index by reducing a temporary
+        copy of this matrix.
+        """
+        return PivotIndex(self.copy()._reduce(accuracy), self.num_cols())
+    def ref(self, accuracy=2, path=None):
+        """
+        Returns the row echelon form of this matrix, stored at PATH or, if
+        PATH is None, in a new temporary file next to this one.
+        ACCURACY: Number of significant decimal places
+
+        >>> import os, tempfile
+        >>> path = os.path.join(tempfile.mkdtemp(), "mat.npy")
+        >>> mat = MappedMatrix.from_matrix(path, [[1, 3, 4, 7], [3, 9, 7, 6]])
+        >>> mat.ref().contents.round(2).tolist()
+        [[3.0, 9.0, 7.0, 6.0], [0.0, 0.0, 1.67, 5.0]]
+        """
+        mat = self.copy(path)
+        mat._reduce(accuracy)
+        return mat
+    def rref(self, accuracy=2, path=None):
+        """
+        Returns the reduced row echelon form of this matrix, stored at PATH
+        or, if PATH is None, in a new temporary file next to this one.
+        Rows are cleared above their pivots from the bottom up, one block
+        of rows at a time.
+        ACCURACY: Number of significant decimal places
+
+        >>> import os, tempfile
+        >>> path = os.path.join(tempfile.mkdtemp(), "mat.npy")
+        >>> mat = MappedMatrix.from_matrix(path, [[1, 3, 4, 7], [3, 9, 7, 6]])
+        >>> mat.rref().contents.round(2).tolist()
+        [[1.0, 3.0, 0.0, -5.0], [0.0, 0.0, 1.0, 3.0]]
+        """
+        mat = self.copy(path)
+        pivot_cols = mat._reduce(accuracy)
+        rank = len(pivot_cols)
+        contents = mat.contents
+        blocks = list(row_blocks(contents.shape, mat.memory_cap // 4))
+        # Step 1: Scale all entries so that values in pivot positions are 1
+        for start, stop in blocks:
+            stop = min(stop, rank)
+            if start >= stop:
+                break
+            block = numpy.array(contents[start:stop])
+            rows = numpy.arange(stop - start)
+            block /= block[rows, pivot_cols[start:stop]][:, numpy.newaxis]
+            contents[start:stop] = block
+        # Step 2: Create zeros above each pivot. The pivot rows are the
+        # first len(pivot_cols) rows; each block is cleared using the
+        # (already reduced) pivot rows below it, then within itself.
+        for start, stop in reversed(blocks):
+            if start >= rank:
+                continue
+            stop = min(stop, rank)
+            block = numpy.array(contents[start:stop])
+            for lower_start, lower_stop in blocks:
+                lower_start, lower_stop = max(lower_start, stop), min(lower_stop, rank)
+                if lower_start >= lower_stop:
+                    continue
+                cols = pivot_cols[lower_start:lower_stop]
+                block -= block[:, cols] @ contents[lower_start:lower_stop]
+            for i in range(stop - start - 1, 0, -1):
+                block[:i] -= numpy.outer(block[:i, pivot_cols[start + i]], block[i])
+            contents[start:stop] = block
+        contents.flush()
+        return mat
+    def _reduce(self, accuracy=2, steps=None):
+        """
+        Reduces this matrix to row echelon form in place, like
+        NumpyMatrix._reduce, with panels narrow enough to fit the memory
+        cap and the columns to their right updated tile by tile.
+        Multipliers recorded in STEPS are kept in memory.
+
+        Returns the (0-based) pivot column of each pivot row, in order.
+        """
+        assert accuracy is not None, \
+            "MappedMatrix stores floats; use Matrix for exact arithmetic."
+        pivot_cols = super()._reduce(accuracy, steps)
+        self.contents.flush()
+        return pivot_cols
+    def _panel_width(self, rows_left):
+        """
+        Returns the number of columns to reduce together when ROWS_LEFT
+        rows remain below the last pivot: as many as fit in a quarter of
+        the memory cap.
+        """
+        return self._floats() // (4 * rows_left)
+    def _update_trailing(self, pivot_row, first_col, multipliers):
+        """
+        Applies the eliminations of one panel to every column from
+        FIRST_COL on, like NumpyMatrix._update_trailing, reading and
+        writing the columns in chunks that fit the memory cap.
+
+        This is a side effect; return type is None.
+        """
+        contents = self.contents
+        num_cols = contents.shape[1]
+        num_pivots = multipliers.shape[1]
+        lower = multipliers[num_pivots:]
+        chunk_cols = max(1, self._floats() // (4 * num_pivots))
+        block_rows = max(1, self._floats() // (4 * chunk_cols))
+        for start in range(first_col, num_cols, chunk_cols):
+            stop = min(start + chunk_cols, num_cols)
+            # The pivot rows only need the eliminations between themselves
+            upper = numpy.array(contents[pivot_row:pivot_row + num_pivots, start:stop])
+            for t in range(num_pivots - 1):
+                upper[t + 1:] -= numpy.outer(multipliers[t + 1:num_pivots, t], upper[t])
+            contents[pivot_row:pivot_row + num_pivots, start:stop] = upper
+            # Every row below gets all of the panel's eliminations at once
+            below = contents[pivot_row + num_pivots:, start:stop]
+            def update(first, last):
+                below[first:last] -= lower[first:last] @ upper
+            self._run_blocks(update, len(lower), block_rows)
+
+def row_blocks(shape, memory_cap):
+    """
+    Yields (start, stop) pairs of row indices that split a matrix of
+    floats with the given SHAPE into consecutive blocks of rows, each
+    taking at most MEMORY_CAP bytes (and at least one row).
+
+    >>> list(row_blocks((5, 2), 32))
+    [(0, 2), (2, 4), (4, 5)]
+    """
+    num_rows, num_cols = shape
+    block_rows = max(1, memory_cap // (8 * max(num_cols, 1)))
+    for start in range(0, num_rows, block_rows):
+        yield start, min(start + block_rows, num_rows)
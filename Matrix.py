@@ -1,10 +1,20 @@
+import io
+import operator
+from fractions import Fraction
+
 import formatting
+import products
 
 class Matrix:
     """
     Describes a 2D matrix, with implementation for extension of the matrix
     and elementary row operations.
     """
+    __slots__ = ("contents", "_cache")
+    # Products are computed in blocks of this many rows and columns, and
+    # square products at least this large use Strassen's algorithm.
+    product_block = 64
+    strassen_cutoff = 256
     def __init__(self, contents=None):
         """
         If contents is not None, then contents should be a list
@@ -28,24 +38,168 @@ class Matrix:
         """
         Returns a string representation of the matrix.
         AFTER_DECIMAL: number of decimal places to show.
+
+        >>> print(Matrix([[1.5, -2], [1e12, 0]]))
+        1.5               -2                
+        1000000000000     0                 
+        """
+        out = io.StringIO()
+        self.write(out, after_decimal)
+        return out.getvalue()[:-1]
+    def write(self, file, after_decimal=2, chunk_rows=256):
+        """
+        Writes the string representation of the matrix to the text file
+        object FILE, one line per row, in chunks of CHUNK_ROWS rows.
+        AFTER_DECIMAL: number of decimal places to show.
+
+        >>> import sys
+        >>> Matrix([[1, 22], [333, 4]]).write(sys.stdout)
+        1       22      
+        333     4       
         """
-        max_magnitude = max(abs(num) for row in self.contents for num in row)
-        max_chars_before_decimal = int(sum(1 for i in range(max_magnitude) if i % 10 == 0) + 1) + 1 # for sign
+        width = self._entry_width(after_decimal)
+        entry_format = "{:<" + str(width) + "}"
+        lines = []
+        for i in range(len(self)):
+            lines.append("".join(
+                entry_format.format(formatting.round2(entry, after_decimal))
+                for entry in self[i]
+            ))
+            if len(lines) == chunk_rows:
+                file.write("\n".join(lines) + "\n")
+                lines = []
+        if lines:
+            file.write("\n".join(lines) + "\n")
+    def _entry_width(self, after_decimal=2):
+        """
+        Returns the number of characters given to each entry when the
+        matrix is written out: room for the digits of the largest
+        magnitude, a sign, a decimal point, AFTER_DECIMAL digits and a
+        space.
+        """
+        max_magnitude = max(
+            (abs(num) for i in range(len(self)) for num in self[i]), default=0
+        )
+        try:
+            digits = len(str(int(max_magnitude)))
+        except (OverflowError, ValueError):
+            digits = len(str(max_magnitude))
+        max_chars_before_decimal = digits + 1 # for sign
         max_chars = max_chars_before_decimal + 1 + after_decimal #add 1 for decimal point
-        out = ""
-        for row in self.contents:
-            for entry in row:
-                out += ("{:<" + str(max_chars + 1) + "}").format(formatting.round2(entry, after_decimal))
-            out += "\n"
-        return out[:-1]
+        return max_chars + 1
     def __getitem__(self, key):
-        return self.contents[key]
+        """
+        Returns row number KEY (0-based), or the entry at KEY if it is a
+        (0-based) pair (row, col). The row is a view, so writing to it
+        writes to this matrix.
+
+        >>> Matrix([[1, 2], [3, 4]])[1, 0]
+        3
+        >>> mat = Matrix([[1, 2], [3, 4]])
+        >>> mat[-1][0] = 5
+        >>> mat[1], mat.contents
+        ([5, 4], [[1, 2], [5, 4]])
+        """
+        if isinstance(key, tuple):
+            return self.contents[key[0]][key[1]]
+        if isinstance(key, slice):
+            return [self._row(i) for i in range(*key.indices(len(self)))]
+        if not -len(self) <= key < len(self):
+            raise IndexError("matrix index out of range")
+        return self._row(key % len(self))
+    def _row(self, i):
+        """
+        Returns a view of the (0-based) row I that can be read and written
+        like a list; writes through it are seen by _memoized.
+        """
+        return RowView(self.contents, i, 0, self.num_cols(), self)
+    def __setitem__(self, key, value):
+        """
+        Sets the entries of row number KEY (0-based) to those of the list
+        VALUE, or, if KEY is a (0-based) pair (row, col), sets the entry
+        there to VALUE.
+
+        This is a side effect; return type is None.
+
+        >>> mat = Matrix([[1, 2], [3, 4]])
+        >>> mat[0, 1] = 5
+        >>> mat[1] = [6, 7]
+        >>> mat.contents
+        [[1, 5], [6, 7]]
+        """
+        if isinstance(key, tuple):
+            self.contents[key[0]][key[1]] = value
+        else:
+            assert len(value) == self.num_cols(), \
+                "Expected {} entries, got {}.".format(self.num_cols(), len(value))
+            self.contents[key][:] = value
+        self._changed()
     def __len__(self):
         return len(self.contents)
+    def num_cols(self):
+        """
+        Returns the number of columns in this matrix.
+
+        >>> Matrix([[1, 2, 3], [4, 5, 6]]).num_cols()
+        3
+        """
+        return len(self.contents[0]) if len(self.contents) else 0
+    def column(self, col):
+        """
+        Returns a list of the entries in the (0-based) column COL.
+
+        >>> Matrix([[1, 2, 3], [4, 5, 6]]).column(-1)
+        [3, 6]
+        """
+        return [row[col] for row in self.contents]
+    def transpose(self):
+        """
+        Returns the transpose of this matrix.
+
+        >>> Matrix([[1, 2, 3], [4, 5, 6]]).transpose().contents
+        [[1, 4], [2, 5], [3, 6]]
+        """
+        return Matrix(products.transpose(
+            [list(self[i]) for i in range(len(self))], self.num_cols()
+        ))
+    def matvec(self, vector):
+        """
+        Returns the product of this matrix and the column VECTOR, as a list.
+
+        >>> Matrix([[1, 2], [3, 4]]).matvec([1, -1])
+        [-1, -1]
+        """
+        assert len(vector) == self.num_cols(), \
+            "Expected {} entries, got {}.".format(self.num_cols(), len(vector))
+        vector = list(vector)
+        return [sum(map(operator.mul, self[i], vector)) for i in range(len(self))]
+    def __matmul__(self, other):
+        """
+        Returns the product of this matrix and OTHER: a Matrix if OTHER is
+        a Matrix, or a list if it is a column vector. Large square
+        products use Strassen's algorithm.
+
+        >>> (Matrix([[1, 2], [3, 4]]) @ Matrix([[5, 6], [7, 8]])).contents
+        [[19, 22], [43, 50]]
+        >>> Matrix([[1, 2], [3, 4]]) @ [1, 1]
+        [3, 7]
+        """
+        if not isinstance(other, Matrix):
+            return self.matvec(other)
+        assert self.num_cols() == len(other), \
+            "Cannot multiply a matrix with {} columns by one with {} rows.".format(
+                self.num_cols(), len(other)
+            )
+        a = [list(self[i]) for i in range(len(self))]
+        b = [list(other[i]) for i in range(len(other))]
+        if len(a) >= self.strassen_cutoff and len(a) == len(b) == other.num_cols():
+            return Matrix(products.strassen(a, b))
+        return Matrix(products.multiply(a, b, other.num_cols(), self.product_block))
     def submatrix(self, start_row=1, start_col=1, end_row=None, end_col=None):
         """
-        Returns a part of the matrix represented by this matrix.
-        Boundaries are inclusive.
+        Returns a view of a part of the matrix represented by this matrix.
+        Boundaries are inclusive. The view shares this matrix's storage, so
+        changes made through either one are seen by both.
 
         >>> mat = Matrix([[1, 2, 3], [4, 5, 6], [7, 8, 9]])
         >>> print(mat.submatrix(2, 2))
@@ -57,62 +211,75 @@ class Matrix:
         >>> print(mat.submatrix(1, 1, 2))
         1     2     3     
         4     5     6     
+        >>> mat.submatrix(2, 2).scale(1, 10)
+        >>> mat.contents
+        [[1, 2, 3], [4, 50, 60], [7, 8, 9]]
         """
         assert start_row > 0, "start_row cannot be less than the minimum row number"
         assert start_col > 0, "start_col cannot be less than the minimum column number"
 
-        if end_row == None: end_row = len(self.contents)
-        if end_col == None: end_col = len(self.contents[0] if len(self.contents) else 0)
-        return Matrix(
-            contents=[
-                row[start_col - 1:end_col]
-                for row in self.contents[start_row-1:end_row]
-            ]
-        )
+        rows = range(len(self.contents))[start_row - 1:end_row]
+        cols = range(self.num_cols())[start_col - 1:end_col]
+        return MatrixView(self, start_row - 1, start_col - 1, len(rows), len(cols))
     def insert(self, other, position):
         """
-        Returns self with values from another matrix (OTHER).
+        Writes the values from another matrix (OTHER) into this one, in
+        place, and returns self. Values that would fall outside this
+        matrix are ignored.
         Position: Ordered pair with the row and column at which the other
         matrix should be inserted.
         
-        >>> mat = Matrix([[1, 2, 3], [4, 5, 6], [7, 8, 9]])
         >>> other = Matrix([[11, 12], [13, 14]])
-        >>> print(mat.insert(other, (1, 1)))
+        >>> print(Matrix([[1, 2, 3], [4, 5, 6], [7, 8, 9]]).insert(other, (1, 1)))
         11     12     3      
         13     14     6      
         7      8      9      
-        >>> print(mat.insert(other, (2, 2)))
+        >>> print(Matrix([[1, 2, 3], [4, 5, 6], [7, 8, 9]]).insert(other, (2, 2)))
         1      2      3      
         4      11     12     
         7      13     14     
-        >>> print(mat.insert(other, (1, 2)))
+        >>> print(Matrix([[1, 2, 3], [4, 5, 6], [7, 8, 9]]).insert(other, (1, 2)))
         1      11     12     
         4      13     14     
         7      8      9      
-        >>> print(mat.insert(other, (3, 3)))
+        >>> print(Matrix([[1, 2, 3], [4, 5, 6], [7, 8, 9]]).insert(other, (3, 3)))
         1      2      3      
         4      5      6      
         7      8      11     
+
+        OTHER may be a view of this matrix, even one overlapping the place
+        it is written to: its entries are read before any are written.
+
+        >>> mat = Matrix([[1, 2, 3], [4, 5, 6], [7, 8, 9]])
+        >>> print(mat.insert(mat.submatrix(1, 1, 2, 2), (2, 2)))
+        1     2     3     
+        4     1     2     
+        7     4     5     
         """
         assert len(position) == 2
         assert min(*position) >= 1
-        if len(self.contents) == 0:
-            return Matrix([])
-        if len(other.contents) == 0:
-            return Matrix([[entry for entry in row] for row in self.contents])
         offset = (position[0] - 1, position[1] - 1)
-        new_contents = [
-            [
-                (
-                    other.contents[i - offset[0]][j - offset[1]]
-                    if i - offset[0] in range(len(other.contents)) and j - offset[1] in range(len(other.contents[0]))
-                    else self.contents[i][j]
-                )
-                for j in range(len(self.contents[0]))
-            ]
-            for i in range(len(self.contents))
-        ]
-        return Matrix(new_contents)
+        num_cols = max(min(other.num_cols(), self.num_cols() - offset[1]), 0)
+        rows = [list(other[i][:num_cols]) for i in range(min(len(other), len(self) - offset[0]))]
+        for i, row in enumerate(rows):
+            self.contents[i + offset[0]][offset[1]:offset[1] + num_cols] = row
+        self._changed()
+        return self
+    def append(self, row):
+        """
+        Adds ROW, a list of entries, to the bottom of this matrix.
+
+        This is a side effect; return type is None.
+
+        >>> mat = Matrix([[1, 2]])
+        >>> mat.append([3, 4])
+        >>> mat.contents
+        [[1, 2], [3, 4]]
+        """
+        assert not len(self) or len(row) == self.num_cols(), \
+            "Expected {} entries, got {}.".format(self.num_cols(), len(row))
+        self.contents.append(list(row))
+        self._changed()
     def replace(self, row_to_mutate, mutator_row, scale):
         """
         Replaces the content of the ROW_TO_MUTATE with its current values plus 
@@ -128,8 +295,11 @@ class Matrix:
         7     8     9     
         """
         assert min(row_to_mutate, mutator_row) > 0
-        for j in range(len(self.contents[row_to_mutate - 1])):
-            self[row_to_mutate - 1][j] += self[mutator_row - 1][j] * scale
+        target = self.contents[row_to_mutate - 1]
+        source = self.contents[mutator_row - 1]
+        for j in range(len(target)):
+            target[j] += source[j] * scale
+        self._changed()
     def interchange(self, row_a, row_b):
         """
         Swaps ROW_A with ROW_B.
@@ -153,6 +323,7 @@ class Matrix:
         temp = self.contents[row_a - 1]
         self.contents[row_a - 1] = self.contents[row_b - 1]
         self.contents[row_b - 1] = temp
+        self._changed()
     def scale(self, row_to_mutate, scale):
         """
         Replaces the content of the ROW_TO_MUTATE with its current values 
@@ -172,18 +343,28 @@ class Matrix:
         4     5     6     
         3.5   4     4.5   
         """
-        self.contents[row_to_mutate - 1] = [
-            entry * scale for entry in self.contents[row_to_mutate - 1]
-        ]
+        row = self.contents[row_to_mutate - 1]
+        row[:] = [entry * scale for entry in row]
+        self._changed()
     def copy(self):
         """
         Returns a copy of this matrix.
         """
         return Matrix([[entry for entry in row] for row in self.contents])
+    def _in_memory(self, rows):
+        """
+        Returns a new matrix of ROWS, of a class whose _replay accepts the
+        steps recorded by this matrix's _reduce.
+        """
+        return type(self)(rows)
     def ref(self, accuracy=2):
         """
-        Returns the row echelon form of this matrix.
-        ACCURACY: Number of significant decimal places
+        Returns the row echelon form of this matrix. It is computed on
+        first use and remembered until the matrix changes; each call
+        returns a new copy.
+        ACCURACY: Number of significant decimal places, or None to
+        compute exactly (integer matrices stay integral; anything else
+        is converted to fractions)
 
         >>> print(Matrix([[1, 3, 4, 7], [3, 9, 7, 6]]).ref())
         3     9     7     6     
@@ -192,28 +373,263 @@ class Matrix:
         -9     12     -6     0      
         0      0      0      0      
         0      0      0      0      
+        >>> Matrix([[1, 3, 4, 7], [3, 9, 7, 6]]).ref(None).contents
+        [[3, 9, 7, 6], [0, 0, 5, 15]]
+        >>> Matrix([[0.5, 1], [1, 1]]).ref(None).contents
+        [[Fraction(1, 1), Fraction(1, 1)], [0, Fraction(1, 2)]]
+        """
+        return self._memoized(("ref", accuracy), self._ref, accuracy)[0].copy()
+    def _ref(self, accuracy=2):
+        """
+        Computes the row echelon form of this matrix for ref, and the
+        PivotIndex found along the way.
         """
         mat = self.copy()
-        if len(self) < 2:
-            return mat
-        first_entries = [row[0] for row in self]
-        if not all(round(entry, accuracy) == 0 for entry in first_entries):
-            # Step 1: Move row with pivot to top
-            max_entry = max(first_entries)
-            min_entry = min(first_entries)
-            row_with_pivot = first_entries.index(
-                max_entry if abs(max_entry) > abs(min_entry) else min_entry
-            ) + 1
-            mat.interchange(row_with_pivot, 1)
+        pivot_cols = mat._reduce(accuracy)
+        return mat, PivotIndex(pivot_cols, self.num_cols())
+    def pivot_index(self, accuracy=2):
+        """
+        Returns the PivotIndex of the row echelon form of this matrix,
+        which elimination finds as it goes; it is remembered along with
+        the row echelon form.
+        ACCURACY: Number of significant decimal places, or None to
+        compute exactly
+
+        >>> index = Matrix([[1, 3, 4, 7], [3, 9, 7, 6]]).pivot_index()
+        >>> index.columns, index.free_columns
+        ([0, 2], [1, 3])
+        """
+        return self._memoized(("ref", accuracy), self._ref, accuracy)[1]
+    def pivots(self, accuracy=2):
+        """
+        Returns the (0-based) (row, col) positions of the pivots of the row
+        echelon form of this matrix.
+        ACCURACY: Number of significant decimal places, or None to
+        compute exactly
+
+        >>> Matrix([[1, 3, 4, 7], [3, 9, 7, 6]]).pivots()
+        [(0, 0), (1, 2)]
+        """
+        return self.pivot_index(accuracy).pivots()
+    def rank(self, accuracy=2):
+        """
+        Returns the rank of this matrix, that is, the number of pivots in
+        its row echelon form.
+        ACCURACY: Number of significant decimal places, or None to
+        compute exactly
+
+        >>> Matrix([[3, -4, 2, 0], [-9, 12, -6, 0], [-6, 8, -4, 0]]).rank()
+        1
+        """
+        return self.pivot_index(accuracy).rank()
+    def _memoized(self, key, compute, *args):
+        """
+        Returns COMPUTE(*ARGS), remembering the result under KEY so that
+        later calls return it at once, until the matrix next changes.
+        Every method that changes the entries calls _changed, which
+        forgets the results, and so do writes through the rows and views
+        the matrix hands out, so a remembered result costs nothing to
+        check. Writes made straight to contents, the raw storage, are not
+        seen. Nothing is remembered for a matrix that shares its storage
+        with another one, since it could be changed through the other.
+
+        >>> mat = Matrix([[1, 2], [2, 4]])
+        >>> mat.rank()
+        1
+        >>> mat[1, 1] = 5
+        >>> mat.rank()
+        2
+        >>> mat[1][1] = 4
+        >>> mat.rank()
+        1
+        >>> mat.submatrix(2, 2)[0][0] = 6
+        >>> mat.rank()
+        2
+        """
+        if not self._cacheable():
+            return compute(*args)
+        results = getattr(self, "_cache", None)
+        if results is None:
+            results = self._cache = dict()
+        if key not in results:
+            results[key] = compute(*args)
+        return results[key]
+    def _cacheable(self):
+        """
+        Returns whether results computed from this matrix's entries may be
+        remembered by _memoized.
+        """
+        return True
+    def _changed(self):
+        """
+        Forgets every result remembered by _memoized. Every method that
+        changes the entries of the matrix calls this, as do its rows and
+        views when they are written to.
+
+        This is a side effect; return type is None.
+        """
+        self._cache = None
+    def _reduce(self, accuracy=2, steps=None):
+        """
+        Reduces this matrix to row echelon form in place, using Gaussian
+        elimination with partial pivoting. Columns whose entries all round
+        to zero at ACCURACY decimal places are skipped. If ACCURACY is None,
+        the entries are converted to fractions and only exact zeros are
+        skipped; a matrix of integers is instead reduced fraction-free.
+
+        If STEPS is a list, one tuple (pivot_row, pivot_col, swapped_row,
+        factors) is appended to it per pivot, recording the (0-based)
+        interchange and the multipliers used to clear the rows below, so
+        that the same elimination can be replayed with _apply_steps.
+
+        Returns the (0-based) pivot column of each pivot row, in order.
+        """
+        self._changed()
+        if accuracy is None:
+            if steps is None and all(
+                    isinstance(entry, int) for row in self.contents for entry in row
+                ):
+                return self._reduce_fraction_free()
+            self.contents = [
+                [Fraction(entry) for entry in row] for row in self.contents
+            ]
+        num_rows = len(self.contents)
+        num_cols = self.num_cols()
+        pivot_cols = []
+        pivot_row = 0
+        for col in range(num_cols):
+            if pivot_row >= num_rows:
+                break
+            # Step 1: Move the row with the largest entry in this column to
+            # the top (negative entries win ties)
+            row_with_pivot = self._pivot_candidate(pivot_row, col)
+            if is_negligible(self.contents[row_with_pivot][col], accuracy):
+                continue
+            self.interchange(row_with_pivot + 1, pivot_row + 1)
             # Step 2: Create zeros below the pivot
-            for row in range(2, len(mat) + 1):
-                mat.replace(row, 1, -mat[row - 1][0] / mat[0][0])
-        # Step 3: Repeat
-        return mat.insert(mat.submatrix(2, 2).ref(), (2, 2))
+            factors = self._eliminate_below(pivot_row, col)
+            if steps is not None:
+                steps.append((pivot_row, col, row_with_pivot, factors))
+            pivot_cols.append(col)
+            # Step 3: Repeat on the rows below
+            pivot_row += 1
+        return pivot_cols
+    def _reduce_fraction_free(self):
+        """
+        Reduces this matrix of integers to row echelon form in place with
+        Bareiss' fraction-free elimination. Every entry stays an integer,
+        and each one is a minor of the original matrix, so the entries grow
+        no faster than the determinant does.
+
+        Returns the (0-based) pivot column of each pivot row, in order.
+        """
+        num_rows = len(self.contents)
+        num_cols = self.num_cols()
+        pivot_cols = []
+        pivot_row = 0
+        previous_pivot = 1
+        for col in range(num_cols):
+            if pivot_row >= num_rows:
+                break
+            row_with_pivot = self._pivot_candidate(pivot_row, col)
+            if self.contents[row_with_pivot][col] == 0:
+                continue
+            self.interchange(row_with_pivot + 1, pivot_row + 1)
+            pivot = self.contents[pivot_row]
+            pivot_tail = pivot[col:]
+            for row in self.contents[pivot_row + 1:]:
+                factor = row[col]
+                row[col:] = [
+                    (pivot[col] * entry - factor * pivot_entry) // previous_pivot
+                    for entry, pivot_entry in zip(row[col:], pivot_tail)
+                ]
+            previous_pivot = pivot[col]
+            pivot_cols.append(col)
+            pivot_row += 1
+        return pivot_cols
+    def _pivot_candidate(self, pivot_row, col):
+        """
+        Returns the (0-based) index of the row at or below PIVOT_ROW whose
+        entry in column COL has the largest magnitude. Negative entries win
+        ties, then the topmost row.
+        """
+        return max(
+            range(pivot_row, len(self.contents)),
+            key=lambda i: (
+                abs(self.contents[i][col]), self.contents[i][col] < 0
+            )
+        )
+    def _eliminate_below(self, pivot_row, col):
+        """
+        Subtracts multiples of the row at (0-based) index PIVOT_ROW from
+        every row below it so that they have zeros in column COL. Entries
+        to the left of COL are assumed to be zero already and are not
+        touched.
+
+        Returns the multipliers used, one per row below PIVOT_ROW.
+        """
+        pivot = self.contents[pivot_row]
+        pivot_tail = pivot[col:]
+        factors = []
+        for row in self.contents[pivot_row + 1:]:
+            factor = row[col] / pivot[col]
+            factors.append(factor)
+            if factor:
+                row[col:] = [
+                    entry - factor * pivot_entry
+                    for entry, pivot_entry in zip(row[col:], pivot_tail)
+                ]
+                row[col] = 0
+        return factors
+    def _apply_steps(self, steps, column):
+        """
+        Returns a copy of COLUMN (one value per row of this matrix) after
+        the interchanges and replacements recorded in STEPS by _reduce
+        have been applied to it.
+        """
+        column = list(column)
+        for pivot_row, _, swapped_row, factors in steps:
+            column[pivot_row], column[swapped_row] = column[swapped_row], column[pivot_row]
+            pivot = column[pivot_row]
+            if pivot:
+                column[pivot_row + 1:] = [
+                    entry - factor * pivot
+                    for entry, factor in zip(column[pivot_row + 1:], factors)
+                ]
+        return column
+    def _replay(self, steps):
+        """
+        Applies the interchanges and replacements recorded in STEPS by
+        _reduce to the rows of this matrix, which must have as many rows as
+        the matrix that was reduced.
+
+        This is a side effect; return type is None.
+        """
+        for pivot_row, _, swapped_row, factors in steps:
+            self.interchange(pivot_row + 1, swapped_row + 1)
+            for i, factor in enumerate(factors, pivot_row + 2):
+                if factor:
+                    self.replace(i, pivot_row + 1, -factor)
+    def _back_substitute(self, pivots, column, solution=None):
+        """
+        Returns a solution of the echelon-form system whose coefficients
+        are this matrix and whose constants are COLUMN. Every variable
+        outside the (0-based) (row, col) PIVOTS is set to zero, or to its
+        value in the list SOLUTION if one is given.
+        """
+        solution = [0] * self.num_cols() if solution is None else list(solution)
+        for row, col in reversed(pivots):
+            entries = self.contents[row]
+            solution[col] = (
+                column[row] - sum(map(operator.mul, entries[col + 1:], solution[col + 1:]))
+            ) / entries[col]
+        return solution
     def rref(self, accuracy=2):
         """
-        Returns the reduced row echelon form of this matrix.
-        ACCURACY: Number of significant decimal places
+        Returns the reduced row echelon form of this matrix. Like ref, it
+        is computed once until the matrix changes.
+        ACCURACY: Number of significant decimal places, or None to
+        compute exactly
 
         >>> print(Matrix([[1, 3, 4, 7], [3, 9, 7, 6]]).rref())
         1     3     0     -5    
@@ -222,24 +638,265 @@ class Matrix:
         1     -1.33 0.67  0     
         0     0     0     0     
         0     0     0     0     
+        >>> Matrix([[1, 3, 4, 7], [3, 9, 7, 6]]).rref(None).contents
+        [[Fraction(1, 1), Fraction(3, 1), Fraction(0, 1), Fraction(-5, 1)], [Fraction(0, 1), Fraction(0, 1), Fraction(1, 1), Fraction(3, 1)]]
+        """
+        return self._memoized(("rref", accuracy), self._rref, accuracy).copy()
+    def _rref(self, accuracy=2):
+        """
+        Computes the reduced row echelon form of this matrix for rref,
+        using the pivots found by elimination.
         """
-        mat = self.ref()
-        if len(self) < 2:
-            return mat
+        mat = self.ref(accuracy)
+        pivots = self.pivots(accuracy)
         # Step 1: Scale all entries so that values in pivot positions are 1
-        for i, row in enumerate(mat):
-            pivot_pos = get_pivot_position(row)
-            if pivot_pos is not None:
-                mat.scale(i + 1, 1 / row[pivot_pos - 1])
+        for i, col in pivots:
+            pivot = mat[i][col]
+            mat.scale(i + 1, 1 / (Fraction(pivot) if accuracy is None else pivot))
         # Step 2: Create zeros above each pivot
-        for i, row in enumerate(mat):
-            pivot_pos = get_pivot_position(row)
-            if pivot_pos is not None:
-                for i2 in range(i):
-                    mat.replace(i2 + 1, i + 1, -mat[i2][pivot_pos - 1] / row[pivot_pos - 1])
+        for i, col in pivots:
+            for i2 in range(i):
+                if mat[i2][col]:
+                    mat.replace(i2 + 1, i + 1, -mat[i2][col] / mat[i][col])
         return mat
 
+class MatrixView(Matrix):
+    """
+    Describes a rectangular block of another matrix. The block is not
+    copied: its rows are RowViews into the other matrix's rows, so reads
+    and writes through the view go straight to the other matrix.
+    """
+    __slots__ = ("parent", "row_offset", "col_offset", "_num_cols")
+    def __init__(self, parent, row_offset, col_offset, num_rows, num_cols):
+        """
+        Creates a view of the NUM_ROWS x NUM_COLS block of PARENT whose top
+        left entry is at the (0-based) ROW_OFFSET and COL_OFFSET.
+        """
+        self.parent = parent
+        self.row_offset = row_offset
+        self.col_offset = col_offset
+        self._num_cols = num_cols
+        self.contents = [
+            RowView(parent.contents, row_offset + i, col_offset, num_cols)
+            for i in range(num_rows)
+        ]
+    def num_cols(self):
+        """
+        Returns the number of columns in this view.
+        """
+        return self._num_cols
+    def _row(self, i):
+        """
+        Returns the (0-based) row I of this view, which tells the matrix
+        it views when it is written to.
+        """
+        row = self.contents[i]
+        return RowView(row.rows, row.row, row.start, row.length, self.parent)
+    def append(self, row):
+        """
+        Views cannot grow; append to the matrix they view instead.
+        """
+        raise TypeError("Cannot append rows to a view of a matrix.")
+    def interchange(self, row_a, row_b):
+        """
+        Swaps the entries of ROW_A with those of ROW_B, within the view.
+
+        This is a side effect; return type is None.
+
+        >>> mat = Matrix([[1, 2, 3], [4, 5, 6]])
+        >>> mat.submatrix(1, 2).interchange(1, 2)
+        >>> mat.contents
+        [[1, 5, 6], [4, 2, 3]]
+        """
+        assert min(row_a, row_b) > 0
+        if row_a == row_b: return
+        a, b = self.contents[row_a - 1], self.contents[row_b - 1]
+        a[:], b[:] = b[:], a[:]
+        self._changed()
+    def _cacheable(self):
+        """
+        Results are never remembered for a view, since its entries can be
+        changed through the matrix it views.
+        """
+        return False
+    def _changed(self):
+        """
+        Makes the matrix this view belongs to forget its remembered
+        results, since its entries have changed too.
+
+        This is a side effect; return type is None.
+        """
+        self.parent._changed()
+
+class RowView:
+    """
+    Describes a run of consecutive entries of one row of a matrix, which
+    can be read and written like a list without being copied.
+    """
+    __slots__ = ("rows", "row", "start", "length", "matrix")
+    def __init__(self, rows, row, start, length, matrix=None):
+        """
+        Creates a view of LENGTH entries of the (0-based) ROW of ROWS (the
+        contents of a matrix), beginning at the (0-based) column START.
+        MATRIX: The matrix whose _changed is called after every write
+        through this view, if any
+        """
+        self.rows = rows
+        self.row = row
+        self.start = start
+        self.length = length
+        self.matrix = matrix
+    def __len__(self):
+        return self.length
+    def __iter__(self):
+        row = self.rows[self.row]
+        if self.start == 0 and self.length == len(row):
+            return iter(row)
+        return (row[self.start + j] for j in range(self.length))
+    def __repr__(self):
+        return repr(self[:])
+    def __eq__(self, other):
+        return list(self) == list(other)
+    def __getitem__(self, key):
+        """
+        Returns entry KEY of this view, or a list of the entries in KEY if
+        it is a slice.
+
+        >>> view = Matrix([[1, 2, 3, 4]]).submatrix(1, 2)[0]
+        >>> view[-1], view[1:], view[::-1]
+        (4, [3, 4], [4, 3, 2])
+        """
+        index = view_position(key, self.start, self.length)
+        row = self.rows[self.row]
+        if isinstance(index, range):
+            if index.step == 1:
+                return row[index.start:index.stop]
+            return [row[i] for i in index]
+        return row[index]
+    def __setitem__(self, key, value):
+        """
+        Sets entry KEY of this view to VALUE, or, if KEY is a slice, sets
+        the entries in it to those of the sequence VALUE, which must have
+        the same length.
+
+        >>> mat = Matrix([[1, 2, 3, 4]])
+        >>> mat.submatrix(1, 2)[0][::-2] = [7, 8]
+        >>> mat.contents
+        [[1, 8, 3, 7]]
+        """
+        index = view_position(key, self.start, self.length)
+        row = self.rows[self.row]
+        if isinstance(index, range):
+            value = list(value)
+            assert len(value) == len(index), "A row view cannot change length."
+            if index.step == 1:
+                row[index.start:index.stop] = value
+            else:
+                for i, entry in zip(index, value):
+                    row[i] = entry
+        else:
+            row[index] = value
+        if self.matrix is not None:
+            self.matrix._changed()
+
+class PivotIndex:
+    """
+    Describes where the pivots of a row echelon form are. The pivot rows
+    are the first rank() rows; COLUMNS holds the (0-based) pivot column
+    of each of them, in order, and FREE_COLUMNS holds the columns without
+    a pivot (those of the free variables, if the matrix holds the
+    coefficients of a linear system).
+    """
+    __slots__ = ("columns", "free_columns")
+    def __init__(self, columns, num_cols):
+        """
+        Creates the index of a row echelon form with NUM_COLS columns
+        whose pivot rows have their pivots in the given COLUMNS.
+
+        >>> PivotIndex([0, 2], 4).free_columns
+        [1, 3]
+        """
+        self.columns = list(columns)
+        pivot_cols = set(self.columns)
+        self.free_columns = [j for j in range(num_cols) if j not in pivot_cols]
+    def __repr__(self):
+        return "PivotIndex({}, {})".format(
+            self.columns, len(self.columns) + len(self.free_columns)
+        )
+    def rank(self):
+        """
+        Returns the number of pivots.
+        """
+        return len(self.columns)
+    def pivots(self):
+        """
+        Returns the (0-based) (row, col) positions of the pivots.
+        """
+        return list(enumerate(self.columns))
+    def pivot_column(self, row):
+        """
+        Returns the (0-based) pivot column of (0-based) ROW, or None if
+        the row has no pivot.
+
+        >>> PivotIndex([0, 2], 4).pivot_column(1), PivotIndex([0, 2], 4).pivot_column(2)
+        (2, None)
+        """
+        return self.columns[row] if row < len(self.columns) else None
+
+def view_position(key, start, length):
+    """
+    Returns the position in an underlying sequence of entry KEY of a view
+    of the LENGTH entries of it beginning at the (0-based) position START,
+    or the range of positions selected if KEY is a slice. Negative keys
+    and steps count from the end of the view, as for a list.
+
+    >>> view_position(-1, 2, 3)
+    4
+    >>> view_position(slice(None, None, -1), 0, 3)
+    range(2, -1, -1)
+    """
+    if isinstance(key, slice):
+        first, stop, step = key.indices(length)
+        return range(start + first, start + stop, step)
+    if key < 0:
+        key += length
+    if not 0 <= key < length:
+        raise IndexError("row index out of range")
+    return start + key
+
 def get_pivot_position(row, accuracy=2):
+    """
+    Returns the (1-based) position of the first entry of ROW that is not
+    negligible at ACCURACY decimal places (or, if ACCURACY is None, that is
+    not exactly zero), or None if there is no such entry.
+
+    >>> get_pivot_position([0, 0.001, 2])
+    3
+    >>> get_pivot_position([0, 0.001, 2], None)
+    2
+    """
     for i in range(len(row)):
-        if round(row[i], accuracy) != 0:
+        if not is_negligible(row[i], accuracy):
             return i + 1
+
+def is_zero_constant(entry, accuracy=2):
+    """
+    Returns whether ENTRY, a constant left over below the pivots when an
+    augmented matrix is reduced, counts as zero, so that the system is
+    still consistent: whether round2 rounds it to zero at ACCURACY decimal
+    places, as LinearSystem has always decided. This is a little laxer
+    than is_negligible. If ACCURACY is None, only an exact zero counts.
+
+    >>> is_zero_constant(0.007), is_negligible(0.007)
+    (True, False)
+    """
+    return formatting.round2(entry, accuracy) == 0
+
+def is_negligible(entry, accuracy=2):
+    """
+    Returns whether ENTRY rounds to zero at ACCURACY decimal places. If
+    ACCURACY is None, only an exact zero is negligible.
+    """
+    if accuracy is None:
+        return entry == 0
+    return round(entry, accuracy) == 0
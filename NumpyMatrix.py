@@ -0,0 +1,400 @@
+import copy
+
+import numpy
+
+from Matrix import Matrix
+
+class NumpyMatrix(Matrix):
+    """
+    Describes a 2D matrix whose contents are stored in a NumPy array, so
+    that row operations and elimination act on whole rows or blocks at
+    once instead of one entry at a time.
+    """
+    # Elimination reduces this many columns at a time before updating the
+    # rest of the matrix, which it does in blocks of this many rows.
+    panel_width = 32
+    block_rows = 256
+    # The matrix whose array this one's is a view of, if it was made by
+    # submatrix
+    parent = None
+    def __init__(self, contents=None, executor=None):
+        """
+        CONTENTS may be anything accepted by Matrix, another Matrix, or a
+        2D NumPy array. The entries are copied into a new array of floats.
+        If contents is None, the matrix is created using user input.
+        EXECUTOR: Optional concurrent.futures executor (normally a
+        ThreadPoolExecutor) on which elimination updates blocks of rows
+        in parallel. NumPy releases the GIL for these updates.
+
+        >>> NumpyMatrix([[1, 2], [3, 4]]).contents.tolist()
+        [[1.0, 2.0], [3.0, 4.0]]
+        >>> NumpyMatrix(Matrix([[1, 2]])).contents.tolist()
+        [[1.0, 2.0]]
+        >>> NumpyMatrix([]).contents.shape
+        (0, 0)
+        """
+        if contents is None:
+            contents = Matrix().contents
+        elif isinstance(contents, Matrix):
+            contents = contents.contents
+        self.contents = numpy.array(contents, dtype=float)
+        if self.contents.ndim != 2:
+            self.contents = self.contents.reshape(len(self.contents), 0)
+        self.executor = executor
+    def num_cols(self):
+        """
+        Returns the number of columns in this matrix.
+        """
+        return self.contents.shape[1]
+    def column(self, col):
+        """
+        Returns an array of the entries in the (0-based) column COL.
+        """
+        return self.contents[:, col].copy()
+    def transpose(self):
+        """
+        Returns the transpose of this matrix.
+
+        >>> NumpyMatrix([[1, 2, 3], [4, 5, 6]]).transpose().contents.tolist()
+        [[1.0, 4.0], [2.0, 5.0], [3.0, 6.0]]
+        """
+        return NumpyMatrix(self.contents.T, self.executor)
+    def matvec(self, vector):
+        """
+        Returns the product of this matrix and the column VECTOR, as an
+        array.
+        """
+        return self.contents @ numpy.asarray(vector, dtype=float)
+    def __matmul__(self, other):
+        """
+        Returns the product of this matrix and OTHER, a Matrix or a column
+        vector, computed by NumPy (and so by BLAS).
+
+        >>> (NumpyMatrix([[1, 2], [3, 4]]) @ Matrix([[5, 6], [7, 8]])).contents.tolist()
+        [[19.0, 22.0], [43.0, 50.0]]
+        """
+        if not isinstance(other, Matrix):
+            return self.matvec(other)
+        if not isinstance(other, NumpyMatrix):
+            other = NumpyMatrix(other)
+        return NumpyMatrix(self.contents @ other.contents, self.executor)
+    def submatrix(self, start_row=1, start_col=1, end_row=None, end_col=None):
+        """
+        Returns a view of a part of the matrix represented by this matrix,
+        sharing its array. Boundaries are inclusive.
+
+        >>> mat = NumpyMatrix([[1, 2, 3], [4, 5, 6], [7, 8, 9]])
+        >>> mat.submatrix(2, 2).contents.tolist()
+        [[5.0, 6.0], [8.0, 9.0]]
+        >>> mat.submatrix(2, 2).scale(1, 10)
+        >>> mat.contents.tolist()
+        [[1.0, 2.0, 3.0], [4.0, 50.0, 60.0], [7.0, 8.0, 9.0]]
+        """
+        assert start_row > 0, "start_row cannot be less than the minimum row number"
+        assert start_col > 0, "start_col cannot be less than the minimum column number"
+        view = copy.copy(self)
+        view.contents = self.contents[start_row - 1:end_row, start_col - 1:end_col]
+        view.parent = self
+        view._cache = None
+        return view
+    def insert(self, other, position):
+        """
+        Writes the values from another matrix (OTHER) into this one, in
+        place, and returns self. Values that would fall outside this
+        matrix are ignored.
+        Position: Ordered pair with the row and column at which the other
+        matrix should be inserted.
+
+        >>> mat = NumpyMatrix([[1, 2, 3], [4, 5, 6], [7, 8, 9]])
+        >>> mat.insert(Matrix([[11, 12], [13, 14]]), (2, 2)).contents.tolist()
+        [[1.0, 2.0, 3.0], [4.0, 11.0, 12.0], [7.0, 13.0, 14.0]]
+        """
+        assert len(position) == 2
+        assert min(*position) >= 1
+        block = other.contents if isinstance(other, NumpyMatrix) else NumpyMatrix(other).contents
+        i, j = position[0] - 1, position[1] - 1
+        target = self.contents[i:i + len(block), j:j + block.shape[1]]
+        target[:] = block[:target.shape[0], :target.shape[1]]
+        self._changed()
+        return self
+    def append(self, row):
+        """
+        Adds ROW, a list of entries, to the bottom of this matrix. The
+        array is reallocated, so this takes time in proportion to the
+        size of the matrix.
+
+        This is a side effect; return type is None.
+
+        >>> mat = NumpyMatrix([[1, 2]])
+        >>> mat.append([3, 4])
+        >>> mat.contents.tolist()
+        [[1.0, 2.0], [3.0, 4.0]]
+        """
+        row = numpy.asarray(row, dtype=float)
+        if not len(self):
+            self.contents = row[numpy.newaxis, :].copy()
+        else:
+            assert len(row) == self.num_cols(), \
+                "Expected {} entries, got {}.".format(self.num_cols(), len(row))
+            self.contents = numpy.vstack([self.contents, row])
+        self._changed()
+    def replace(self, row_to_mutate, mutator_row, scale):
+        """
+        Replaces the content of the ROW_TO_MUTATE with its current values plus
+        the values in the MUTATOR_ROW times SCALE.
+
+        This is a side effect; return type is None.
+
+        >>> mat = NumpyMatrix([[1, 2, 3], [4, 5, 6]])
+        >>> mat.replace(2, 1, -2)
+        >>> mat.contents.tolist()
+        [[1.0, 2.0, 3.0], [2.0, 1.0, 0.0]]
+        """
+        assert min(row_to_mutate, mutator_row) > 0
+        self.contents[row_to_mutate - 1] += self.contents[mutator_row - 1] * scale
+        self._changed()
+    def interchange(self, row_a, row_b):
+        """
+        Swaps ROW_A with ROW_B.
+
+        This is a side effect; return type is None.
+
+        >>> mat = NumpyMatrix([[1, 2], [3, 4]])
+        >>> mat.interchange(2, 1)
+        >>> mat.contents.tolist()
+        [[3.0, 4.0], [1.0, 2.0]]
+        """
+        assert min(row_a, row_b) > 0
+        if row_a == row_b: return
+        self.contents[[row_a - 1, row_b - 1]] = self.contents[[row_b - 1, row_a - 1]]
+        self._changed()
+    def scale(self, row_to_mutate, scale):
+        """
+        Replaces the content of the ROW_TO_MUTATE with its current values
+        times SCALE.
+
+        This is a side effect; return type is None.
+
+        >>> mat = NumpyMatrix([[1, 2], [3, 4]])
+        >>> mat.scale(2, 0.5)
+        >>> mat.contents.tolist()
+        [[1.0, 2.0], [1.5, 2.0]]
+        """
+        self.contents[row_to_mutate - 1] *= scale
+        self._changed()
+    def copy(self):
+        """
+        Returns a copy of this matrix.
+        """
+        return NumpyMatrix(self.contents, self.executor)
+    def _cacheable(self):
+        """
+        Results are not remembered for a view made by submatrix, since its
+        entries can be changed through the matrix it views.
+        """
+        return self.parent is None
+    def _changed(self):
+        """
+        Forgets every result remembered by _memoized, including those of
+        the matrix this one is a view of, if any.
+
+        This is a side effect; return type is None.
+        """
+        self._cache = None
+        if self.parent is not None:
+            self.parent._changed()
+    def _rref(self, accuracy=2):
+        """
+        Computes the reduced row echelon form of this matrix for rref,
+        clearing each pivot column with one rank-one update.
+
+        >>> NumpyMatrix([[1, 3, 4, 7], [3, 9, 7, 6]]).rref().contents.round(2).tolist()
+        [[1.0, 3.0, 0.0, -5.0], [0.0, 0.0, 1.0, 3.0]]
+        """
+        mat = self.ref(accuracy)
+        contents = mat.contents
+        pivot_cols = self.pivot_index(accuracy).columns
+        pivot_rows = numpy.arange(len(pivot_cols))
+        # Step 1: Scale all entries so that values in pivot positions are 1
+        contents[pivot_rows] /= contents[pivot_rows, pivot_cols][:, numpy.newaxis]
+        # Step 2: Create zeros above each pivot
+        for i, col in zip(pivot_rows, pivot_cols):
+            contents[:i] -= numpy.outer(contents[:i, col], contents[i])
+        return mat
+    def _reduce(self, accuracy=2, steps=None):
+        """
+        Reduces this matrix to row echelon form in place, with the same
+        pivots as Matrix._reduce, one panel of columns at a time: the panel
+        is reduced on its own, then the columns to its right receive all
+        of its eliminations at once, one matrix product per block of rows.
+        Exact arithmetic (ACCURACY of None) is not available on float
+        arrays.
+
+        Returns the (0-based) pivot column of each pivot row, in order.
+        """
+        assert accuracy is not None, \
+            "NumpyMatrix stores floats; use Matrix for exact arithmetic."
+        self._changed()
+        contents = self.contents
+        num_rows, num_cols = contents.shape
+        pivot_cols = []
+        pivot_row = 0
+        col = 0
+        while col < num_cols and pivot_row < num_rows:
+            rows_left = num_rows - pivot_row
+            width = max(1, min(num_cols - col, self._panel_width(rows_left)))
+            panel = numpy.array(contents[pivot_row:, col:col + width])
+            # Multipliers are kept in the entries they clear, so that later
+            # interchanges within the panel move them along with their rows
+            panel_cols = []
+            for j in range(width):
+                local = len(panel_cols)
+                if local >= rows_left:
+                    break
+                offset = choose_pivot(panel[local:, j], accuracy)
+                if offset is None:
+                    continue
+                swapped = local + offset
+                if swapped != local:
+                    panel[[local, swapped]] = panel[[swapped, local]]
+                    self.interchange(pivot_row + local + 1, pivot_row + swapped + 1)
+                factors = panel[local + 1:, j] / panel[local, j]
+                panel[local + 1:, j + 1:] -= numpy.outer(factors, panel[local, j + 1:])
+                panel[local + 1:, j] = factors
+                panel_cols.append(j)
+                if steps is not None:
+                    steps.append((pivot_row + local, col + j, pivot_row + swapped, factors))
+            num_pivots = len(panel_cols)
+            pivot_cols.extend(col + j for j in panel_cols)
+            multipliers = numpy.tril(panel[:, panel_cols], -1)
+            for t, j in enumerate(panel_cols):
+                panel[t + 1:, j] = 0
+            contents[pivot_row:, col:col + width] = panel
+            del panel
+            if num_pivots:
+                self._update_trailing(pivot_row, col + width, multipliers)
+            pivot_row += num_pivots
+            col += width
+        return pivot_cols
+    def _panel_width(self, rows_left):
+        """
+        Returns the number of columns to reduce together when ROWS_LEFT
+        rows remain below the last pivot.
+        """
+        return self.panel_width
+    def _update_trailing(self, pivot_row, first_col, multipliers):
+        """
+        Applies the eliminations of one panel to every column from
+        FIRST_COL on. The panel's pivots are in consecutive rows starting
+        at (0-based) PIVOT_ROW, and column t of MULTIPLIERS holds the
+        multipliers of pivot t for the rows from PIVOT_ROW on.
+
+        This is a side effect; return type is None.
+        """
+        num_pivots = multipliers.shape[1]
+        # The pivot rows only need the eliminations between themselves
+        upper = self.contents[pivot_row:pivot_row + num_pivots, first_col:]
+        for t in range(num_pivots - 1):
+            upper[t + 1:] -= numpy.outer(multipliers[t + 1:num_pivots, t], upper[t])
+        # Every row below gets all of the panel's eliminations at once
+        lower = multipliers[num_pivots:]
+        below = self.contents[pivot_row + num_pivots:, first_col:]
+        def update(start, stop):
+            below[start:stop] -= lower[start:stop] @ upper
+        self._run_blocks(update, len(lower), self.block_rows)
+    def _run_blocks(self, function, num_rows, block_rows):
+        """
+        Calls FUNCTION(start, stop) for consecutive blocks of BLOCK_ROWS
+        out of NUM_ROWS rows, on the executor if this matrix has one. The
+        calls must touch disjoint rows.
+        """
+        blocks = [
+            (start, min(start + block_rows, num_rows))
+            for start in range(0, num_rows, block_rows)
+        ]
+        if self.executor is None or len(blocks) < 2:
+            for start, stop in blocks:
+                function(start, stop)
+            return
+        for future in [self.executor.submit(function, *block) for block in blocks]:
+            future.result()
+    def _apply_steps(self, steps, column):
+        """
+        Returns a copy of COLUMN as an array, after the interchanges and
+        replacements recorded in STEPS by _reduce have been applied to it.
+        """
+        column = numpy.array(column, dtype=float)
+        for pivot_row, _, swapped_row, factors in steps:
+            column[[pivot_row, swapped_row]] = column[[swapped_row, pivot_row]]
+            column[pivot_row + 1:] -= factors * column[pivot_row]
+        return column
+    def _replay(self, steps):
+        """
+        Applies the interchanges and replacements recorded in STEPS by
+        _reduce to the rows of this matrix, one rank-one update per step.
+
+        This is a side effect; return type is None.
+        """
+        for pivot_row, _, swapped_row, factors in steps:
+            self.interchange(pivot_row + 1, swapped_row + 1)
+            self.contents[pivot_row + 1:] -= numpy.outer(
+                factors, self.contents[pivot_row]
+            )
+        self._changed()
+    def _back_substitute(self, pivots, column, solution=None):
+        """
+        Returns a solution of the echelon-form system whose coefficients
+        are this matrix and whose constants are COLUMN. Every variable
+        outside the (0-based) (row, col) PIVOTS is set to zero, or to its
+        value in the list SOLUTION if one is given.
+        """
+        if solution is None:
+            solution = numpy.zeros(self.contents.shape[1])
+        else:
+            solution = numpy.array(solution, dtype=float)
+        for row, col in reversed(pivots):
+            entries = self.contents[row]
+            solution[col] = (
+                column[row] - entries[col + 1:] @ solution[col + 1:]
+            ) / entries[col]
+        return solution
+
+def choose_pivot(column, accuracy=2):
+    """
+    Returns the index of the entry of the array COLUMN with the largest
+    magnitude (negative entries win ties, then the first), or None if
+    that entry rounds to zero at ACCURACY decimal places.
+
+    >>> choose_pivot(numpy.array([1, -3, 3]))
+    1
+    >>> choose_pivot(numpy.array([0.001, 0])) is None
+    True
+    """
+    magnitudes = numpy.abs(column)
+    largest = magnitudes.max()
+    if round(largest, accuracy) == 0:
+        return
+    candidates = numpy.flatnonzero(magnitudes == largest)
+    negative = candidates[column[candidates] < 0]
+    return int((negative if len(negative) else candidates)[0])
+
+def are_zero_constants(constants, accuracy=2):
+    """
+    Returns the boolean array telling, for each entry of the array
+    CONSTANTS, whether Matrix.is_zero_constant holds for it: whether
+    formatting.round2 rounds it to zero at ACCURACY decimal places.
+
+    >>> from Matrix import is_zero_constant
+    >>> constants = numpy.array([0.007, -0.00999, 0.011, 0.4, 0.6, -2])
+    >>> are_zero_constants(constants).tolist()
+    [True, True, False, False, False, False]
+    >>> [is_zero_constant(entry) for entry in constants.tolist()]
+    [True, True, False, False, False, False]
+    """
+    nearest = numpy.round(constants)
+    rounded = numpy.where(
+        numpy.abs(constants - nearest) < 0.1**accuracy,
+        nearest,
+        numpy.round(constants, accuracy)
+    )
+    return rounded == 0
@@ -0,0 +1,518 @@
+import math
+from fractions import Fraction
+
+class Polynomial:
+    """
+    Describes a polynomial with integer coefficients in any number of
+    variables, stored sparsely as a dictionary mapping each monomial to
+    its nonzero coefficient. A monomial is a tuple of (variable,
+    exponent) pairs in order of variable, with positive exponents, so
+    the constant monomial is (). Every polynomial has exactly one such
+    representation, so equal polynomials compare and hash equal.
+
+    >>> a, b = Polynomial.variable("a"), Polynomial.variable("b")
+    >>> print((a + b) * (a - b))
+    aa - bb
+    >>> (a + 1) ** 2 == a * a + 2 * a + 1
+    True
+    """
+    __slots__ = ("terms",)
+    def __init__(self, terms=None):
+        """
+        TERMS: A dictionary mapping monomials to integer coefficients,
+        or None for the zero polynomial. Zero coefficients are dropped.
+        """
+        self.terms = {
+            monomial: coefficient
+            for monomial, coefficient in (terms or {}).items() if coefficient
+        }
+    @classmethod
+    def constant(cls, value):
+        """
+        Returns the constant polynomial whose value is the integer VALUE.
+        """
+        return cls({(): value})
+    @classmethod
+    def variable(cls, name):
+        """
+        Returns the polynomial consisting of the variable NAME.
+        """
+        return cls({((name, 1),): 1})
+    @classmethod
+    def sum(cls, polynomials):
+        """
+        Returns the sum of the iterable of POLYNOMIALS, adding each term
+        into one dictionary, so that the time taken is proportional to
+        the total number of terms.
+
+        >>> x = Polynomial.variable("x")
+        >>> print(Polynomial.sum([x, 2 * x * x, -x, Polynomial.constant(3)]))
+        2xx + 3
+        """
+        terms = {}
+        for polynomial in polynomials:
+            for monomial, coefficient in polynomial.terms.items():
+                terms[monomial] = terms.get(monomial, 0) + coefficient
+        return cls(terms)
+    def __eq__(self, other):
+        if isinstance(other, int):
+            other = Polynomial.constant(other)
+        return isinstance(other, Polynomial) and self.terms == other.terms
+    def __hash__(self):
+        return hash(frozenset(self.terms.items()))
+    def __bool__(self):
+        """
+        Returns whether this polynomial is not zero.
+        """
+        return bool(self.terms)
+    def __repr__(self):
+        return "Polynomial({!r})".format(self.terms)
+    def __str__(self):
+        """
+        Returns the terms of this polynomial in canonical order, with
+        variables written next to each other and a variable raised to a
+        power written that many times.
+
+        >>> print(Polynomial({(("b", 1), ("c", 1)): 1, (("a", 2),): -3, (): 2}))
+        -3aa + bc + 2
+        """
+        parts = []
+        for monomial, coefficient in self.sorted_terms():
+            text = _monomial_string(monomial)
+            if coefficient == -1 and text:
+                text = "-" + text
+            elif coefficient != 1 or not text:
+                text = str(coefficient) + text
+            if parts and text.startswith("-"):
+                parts.append("- " + text[1:])
+            else:
+                parts.append(("+ " if parts else "") + text)
+        return " ".join(parts) or "0"
+    def sorted_terms(self):
+        """
+        Returns the pairs (monomial, coefficient) of this polynomial in
+        canonical order: by their variables written out, as in str, with
+        the constant term last.
+        """
+        return sorted(
+            self.terms.items(),
+            key=lambda term: (not term[0], _monomial_string(term[0]))
+        )
+    def __add__(self, other):
+        other = _coerce(other)
+        if other is NotImplemented:
+            return other
+        terms = dict(self.terms)
+        for monomial, coefficient in other.terms.items():
+            terms[monomial] = terms.get(monomial, 0) + coefficient
+        return Polynomial(terms)
+    __radd__ = __add__
+    def __neg__(self):
+        return Polynomial({
+            monomial: -coefficient for monomial, coefficient in self.terms.items()
+        })
+    def __sub__(self, other):
+        other = _coerce(other)
+        if other is NotImplemented:
+            return other
+        return self + -other
+    def __rsub__(self, other):
+        return -self + other
+    def __mul__(self, other):
+        """
+        Returns the product of this polynomial and OTHER, with every
+        product of terms distributed and like terms combined.
+
+        >>> x = Polynomial.variable("x")
+        >>> print((x + 2) * (x - 3))
+        -x + xx - 6
+        """
+        other = _coerce(other)
+        if other is NotImplemented:
+            return other
+        terms = {}
+        for monomial_a, coefficient_a in self.terms.items():
+            for monomial_b, coefficient_b in other.terms.items():
+                monomial = _multiply_monomials(monomial_a, monomial_b)
+                terms[monomial] = terms.get(monomial, 0) + coefficient_a * coefficient_b
+        return Polynomial(terms)
+    __rmul__ = __mul__
+    def __pow__(self, exponent):
+        assert isinstance(exponent, int) and exponent >= 0, \
+            "Polynomials can only be raised to nonnegative integer powers."
+        result = Polynomial.constant(1)
+        base = self
+        while exponent:
+            if exponent & 1:
+                result *= base
+            base *= base
+            exponent >>= 1
+        return result
+    def is_constant(self):
+        """
+        Returns whether this polynomial has no variables.
+        """
+        return all(not monomial for monomial in self.terms)
+    def constant_value(self):
+        """
+        Returns the constant term of this polynomial.
+        """
+        return self.terms.get((), 0)
+    def variables(self):
+        """
+        Returns the set of variables that appear in this polynomial.
+        """
+        return {name for monomial in self.terms for name, exponent in monomial}
+    def degree(self, variable):
+        """
+        Returns the highest power of VARIABLE in this polynomial, or -1 if
+        this polynomial is zero.
+        """
+        return max(
+            (dict(monomial).get(variable, 0) for monomial in self.terms), default=-1
+        )
+    def coefficients(self, variable):
+        """
+        Returns a dictionary mapping each power of VARIABLE in this
+        polynomial to its coefficient, a polynomial without VARIABLE.
+
+        >>> x, y = Polynomial.variable("x"), Polynomial.variable("y")
+        >>> {power: str(coefficient) for power, coefficient in (x * x * y + x + y).coefficients("x").items()}
+        {2: 'y', 1: '1', 0: 'y'}
+        """
+        out = {}
+        for monomial, coefficient in self.terms.items():
+            power = 0
+            rest = []
+            for name, exponent in monomial:
+                if name == variable:
+                    power = exponent
+                else:
+                    rest.append((name, exponent))
+            terms = out.setdefault(power, {})
+            terms[tuple(rest)] = coefficient
+        return {power: Polynomial(terms) for power, terms in out.items()}
+    def leading_term(self):
+        """
+        Returns the pair (monomial, coefficient) of the greatest term of
+        this polynomial in lexicographic order, in which a monomial is
+        greater than another if it has a higher power of the first
+        variable (alphabetically) in which they differ.
+        """
+        monomial = max(self.terms, key=_lex_key)
+        return monomial, self.terms[monomial]
+    def normalized(self):
+        """
+        Returns this polynomial or its negation, whichever has a positive
+        leading coefficient.
+        """
+        if self and self.leading_term()[1] < 0:
+            return -self
+        return self
+    def exact_quotient(self, divisor):
+        """
+        Returns the polynomial that gives this one when multiplied by
+        DIVISOR, which must divide it exactly.
+
+        >>> x, y = Polynomial.variable("x"), Polynomial.variable("y")
+        >>> print((x * x - y * y).exact_quotient(x + y))
+        x - y
+        """
+        assert divisor, "Cannot divide by the zero polynomial."
+        divisor_monomial, divisor_coefficient = divisor.leading_term()
+        remainder = dict(self.terms)
+        quotient = {}
+        while remainder:
+            monomial = max(remainder, key=_lex_key)
+            coefficient = remainder[monomial]
+            factor = _divide_monomials(monomial, divisor_monomial)
+            assert factor is not None and coefficient % divisor_coefficient == 0, \
+                "{} does not divide {}.".format(divisor, self)
+            factor_coefficient = coefficient // divisor_coefficient
+            quotient[factor] = factor_coefficient
+            for other, other_coefficient in divisor.terms.items():
+                product = _multiply_monomials(factor, other)
+                value = remainder.get(product, 0) - factor_coefficient * other_coefficient
+                if value:
+                    remainder[product] = value
+                else:
+                    del remainder[product]
+        return Polynomial(quotient)
+    def gcd(self, other):
+        """
+        Returns the greatest common divisor of this polynomial and OTHER,
+        with a positive leading coefficient. Polynomials are treated as
+        polynomials in their first variable whose coefficients are
+        polynomials in the others, and the GCD is found with a primitive
+        remainder sequence, working down one variable at a time.
+
+        >>> x, y = Polynomial.variable("x"), Polynomial.variable("y")
+        >>> print((6 * x * x - 6 * y * y).gcd(4 * x * x + 8 * x * y + 4 * y * y))
+        2x + 2y
+        """
+        other = _coerce(other)
+        if not self:
+            return other.normalized()
+        if not other:
+            return self.normalized()
+        if len(self.terms) == 1 or len(other.terms) == 1:
+            return _monomial_gcd(self, other)
+        variable = min(self.variables() | other.variables())
+        content_a = self.content(variable)
+        content_b = other.content(variable)
+        common = content_a.gcd(content_b)
+        a = self.exact_quotient(content_a)
+        b = other.exact_quotient(content_b)
+        if a.degree(variable) < b.degree(variable):
+            a, b = b, a
+        while b.degree(variable) > 0:
+            remainder = a.pseudo_remainder(b, variable)
+            if not remainder:
+                return (common * b).normalized()
+            a, b = b, remainder.exact_quotient(remainder.content(variable))
+        return common
+    def content(self, variable):
+        """
+        Returns the GCD of the coefficients of this polynomial read as a
+        polynomial in VARIABLE.
+        """
+        result = Polynomial()
+        for coefficient in self.coefficients(variable).values():
+            result = result.gcd(coefficient)
+        return result
+    def pseudo_remainder(self, divisor, variable):
+        """
+        Returns the remainder of this polynomial, scaled by a power of the
+        leading coefficient of DIVISOR, after division by DIVISOR, both
+        read as polynomials in VARIABLE. It has a lower degree in VARIABLE
+        than DIVISOR.
+        """
+        degree = divisor.degree(variable)
+        leading = divisor.coefficients(variable)[degree]
+        remainder = self
+        while remainder and remainder.degree(variable) >= degree:
+            power = remainder.degree(variable)
+            shift = Polynomial({((variable, power - degree),) if power > degree else (): 1})
+            remainder = (
+                remainder * leading
+                - remainder.coefficients(variable)[power] * shift * divisor
+            )
+        return remainder
+
+class RationalFunction:
+    """
+    Describes a quotient of two polynomials in lowest terms: their GCD
+    is cancelled, and the denominator has a positive leading
+    coefficient, so every rational function has one representation.
+
+    >>> x = RationalFunction(Polynomial.variable("x"))
+    >>> print((x * x - 1) / (x + 1))
+    x - 1
+    >>> print(1 / x + 1 / (x + 1))
+    (2x + 1)/(x + xx)
+    """
+    __slots__ = ("numerator", "denominator")
+    def __init__(self, numerator, denominator=1):
+        """
+        NUMERATOR and DENOMINATOR may be polynomials, integers, or
+        fractions.
+        """
+        numerator, scale_a = _polynomial_and_scale(numerator)
+        denominator, scale_b = _polynomial_and_scale(denominator)
+        if scale_b != 1:
+            numerator *= scale_b
+        if scale_a != 1:
+            denominator *= scale_a
+        if not denominator:
+            raise ZeroDivisionError("The denominator of a rational function is zero.")
+        # A polynomial over 1 is already in lowest terms
+        if denominator != 1:
+            common = numerator.gcd(denominator)
+            if common != 1:
+                numerator = numerator.exact_quotient(common)
+                denominator = denominator.exact_quotient(common)
+            if denominator.leading_term()[1] < 0:
+                numerator, denominator = -numerator, -denominator
+        self.numerator = numerator
+        self.denominator = denominator
+    def __eq__(self, other):
+        other = _coerce_function(other)
+        return isinstance(other, RationalFunction) \
+            and self.numerator == other.numerator and self.denominator == other.denominator
+    def __hash__(self):
+        return hash((self.numerator, self.denominator))
+    def __bool__(self):
+        return bool(self.numerator)
+    def __repr__(self):
+        return "RationalFunction({!r}, {!r})".format(self.numerator, self.denominator)
+    def __str__(self):
+        if self.denominator == 1:
+            return str(self.numerator)
+        return "{}/{}".format(_grouped(self.numerator), _grouped(self.denominator))
+    def __add__(self, other):
+        other = _coerce_function(other)
+        if other is NotImplemented:
+            return other
+        if self.denominator == other.denominator:
+            return RationalFunction(self.numerator + other.numerator, self.denominator)
+        return RationalFunction(
+            self.numerator * other.denominator + other.numerator * self.denominator,
+            self.denominator * other.denominator
+        )
+    __radd__ = __add__
+    @classmethod
+    def sum(cls, functions):
+        """
+        Returns the sum of the iterable of rational FUNCTIONS. The
+        numerators of the functions with each denominator are added at
+        once, with Polynomial.sum, and only the few partial sums are
+        brought to a common denominator, so a long sum of polynomials
+        takes time proportional to its number of terms.
+
+        >>> x = RationalFunction(Polynomial.variable("x"))
+        >>> print(RationalFunction.sum([x, 1 / x, 2 * x, 1 / x]))
+        (3xx + 2)/x
+        """
+        numerators = {}
+        for function in functions:
+            numerators.setdefault(function.denominator, []).append(function.numerator)
+        total = cls(0)
+        for denominator, group in numerators.items():
+            total += cls(Polynomial.sum(group), denominator)
+        return total
+    def __neg__(self):
+        return RationalFunction(-self.numerator, self.denominator)
+    def __sub__(self, other):
+        other = _coerce_function(other)
+        if other is NotImplemented:
+            return other
+        return self + -other
+    def __rsub__(self, other):
+        return -self + other
+    def __mul__(self, other):
+        other = _coerce_function(other)
+        if other is NotImplemented:
+            return other
+        return RationalFunction(
+            self.numerator * other.numerator, self.denominator * other.denominator
+        )
+    __rmul__ = __mul__
+    def __truediv__(self, other):
+        other = _coerce_function(other)
+        if other is NotImplemented:
+            return other
+        return RationalFunction(
+            self.numerator * other.denominator, self.denominator * other.numerator
+        )
+    def __rtruediv__(self, other):
+        return _coerce_function(other) / self
+    def __pow__(self, exponent):
+        assert isinstance(exponent, int), "Exponents must be integers."
+        if exponent < 0:
+            return 1 / self ** -exponent
+        return RationalFunction(self.numerator ** exponent, self.denominator ** exponent)
+
+def _coerce(value):
+    """
+    Returns VALUE as a Polynomial if it is a Polynomial or an integer,
+    and NotImplemented otherwise.
+    """
+    if isinstance(value, Polynomial):
+        return value
+    if isinstance(value, int):
+        return Polynomial.constant(value)
+    return NotImplemented
+
+def _coerce_function(value):
+    """
+    Returns VALUE as a RationalFunction if it is one, or a polynomial,
+    integer or fraction, and NotImplemented otherwise.
+    """
+    if isinstance(value, RationalFunction):
+        return value
+    if isinstance(value, (Polynomial, int, Fraction)):
+        return RationalFunction(value)
+    return NotImplemented
+
+def _polynomial_and_scale(value):
+    """
+    Returns a pair (polynomial, scale) such that the polynomial divided
+    by the integer scale is VALUE, a polynomial, integer or fraction.
+    """
+    if isinstance(value, Fraction):
+        return Polynomial.constant(value.numerator), value.denominator
+    return _coerce(value), 1
+
+def _grouped(polynomial):
+    """
+    Returns str(POLYNOMIAL), in parentheses if it has several terms.
+    """
+    text = str(polynomial)
+    return "({})".format(text) if len(polynomial.terms) > 1 else text
+
+def _monomial_string(monomial):
+    """
+    Returns the variables of MONOMIAL written next to each other, each as
+    many times as its exponent.
+    """
+    return "".join(name * exponent for name, exponent in monomial)
+
+def _lex_key(monomial):
+    """
+    Returns a key that sorts monomials in lexicographic order, in which
+    earlier variables (alphabetically) weigh more.
+    """
+    return tuple(
+        (tuple(-ord(character) for character in name) + (1,), exponent)
+        for name, exponent in monomial
+    )
+
+def _multiply_monomials(a, b):
+    """
+    Returns the product of the monomials A and B.
+    """
+    if not a:
+        return b
+    if not b:
+        return a
+    exponents = dict(a)
+    for name, exponent in b:
+        exponents[name] = exponents.get(name, 0) + exponent
+    return tuple(sorted(exponents.items()))
+
+def _divide_monomials(a, b):
+    """
+    Returns the monomial that gives A when multiplied by B, or None if B
+    does not divide A.
+    """
+    exponents = dict(a)
+    for name, exponent in b:
+        left = exponents.get(name, 0) - exponent
+        if left < 0:
+            return
+        if left:
+            exponents[name] = left
+        else:
+            del exponents[name]
+    return tuple(sorted(exponents.items()))
+
+def _monomial_gcd(a, b):
+    """
+    Returns the GCD of the nonzero polynomials A and B, at least one of
+    which has a single term: the GCD of all of their coefficients times
+    the lowest power of each variable common to all of their terms.
+    """
+    coefficient = 0
+    exponents = None
+    for polynomial in (a, b):
+        for monomial, value in polynomial.terms.items():
+            coefficient = math.gcd(coefficient, value)
+            if exponents is None:
+                exponents = dict(monomial)
+            else:
+                powers = dict(monomial)
+                exponents = {
+                    name: min(exponent, powers[name])
+                    for name, exponent in exponents.items() if name in powers
+                }
+    return Polynomial({tuple(sorted(exponents.items())): coefficient})
@@ -1,5 +1,85 @@
+import collections
+import re
+import weakref
+
 import maths
-import utils
+from Polynomial import Polynomial, RationalFunction
+
+# Every live expression, keyed by its type and its parts, so that
+# structurally identical expressions are one shared object
+_nodes = weakref.WeakValueDictionary()
+
+def _node(cls, key, **attributes):
+    """Returns the expression of type CLS identified by KEY, creating it
+    with the given ATTRIBUTES if no such expression exists yet.
+    """
+    key = (cls, key)
+    node = _nodes.get(key)
+    if node is None:
+        node = object.__new__(cls)
+        node._memo = None
+        for name, value in attributes.items():
+            setattr(node, name, value)
+        _nodes[key] = node
+    return node
+
+class ExpressionCache:
+    """A bounded cache of results computed from expressions, which
+    keeps the MAX_SIZE most recently used ones. Its keys hold the
+    (hash-consed) expressions they were computed from, so a result is
+    found again even if the expression is rebuilt from scratch. Counts
+    of hits, misses and evictions are kept for tuning MAX_SIZE.
+
+    >>> lengths = ExpressionCache(2)
+    >>> [lengths.get(word, lambda: len(word)) for word in ["ab", "c", "ab", "def"]]
+    [2, 1, 2, 3]
+    >>> lengths.hits, lengths.misses, lengths.evictions, lengths.hit_rate()
+    (1, 3, 1, 0.25)
+    >>> "c" in lengths
+    False
+    """
+    def __init__(self, max_size=4096):
+        self.max_size = max_size
+        self._entries = collections.OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+    def __len__(self):
+        return len(self._entries)
+    def __contains__(self, key):
+        return key in self._entries
+    def __repr__(self):
+        return "ExpressionCache({}/{} entries, {} hits, {} misses, {} evictions)".format(
+            len(self), self.max_size, self.hits, self.misses, self.evictions
+        )
+    def get(self, key, compute):
+        """Returns the result stored for KEY, or, if there is none, the
+        result of calling COMPUTE, which is stored for next time. If the
+        cache is full, the least recently used result is evicted.
+        """
+        entries = self._entries
+        if key in entries:
+            self.hits += 1
+            entries.move_to_end(key)
+            return entries[key]
+        self.misses += 1
+        value = compute()
+        entries[key] = value
+        if len(entries) > self.max_size:
+            entries.popitem(last=False)
+            self.evictions += 1
+        return value
+    def hit_rate(self):
+        """Returns the fraction of lookups that found a stored result."""
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+    def clear(self):
+        """Forgets every stored result and resets the counts."""
+        self._entries.clear()
+        self.hits = self.misses = self.evictions = 0
+
+# The shared cache of simplified forms and rational functions
+cache = ExpressionCache()
 
 # def get_like_terms(terms):
 #     """Returns a dictionary containing the like terms in the 
@@ -51,50 +131,188 @@ import utils
 #     return ret
 
 
+class ExpressionSyntaxError(ValueError):
+    """Raised when a string does not describe an expression. POSITION
+    is the (0-based) index in the string where the problem was found.
+    """
+    def __init__(self, message, string, position):
+        start = max(0, position - 30)
+        excerpt = string[start:position + 30]
+        super().__init__("{} at position {}:\n{}\n{}^".format(
+            message, position, excerpt, " " * (position - start)
+        ))
+        self.position = position
+
+# One token: an integer, a one-letter variable, an operator or
+# parenthesis, a run of whitespace, or anything else (an error)
+_TOKEN = re.compile(r"(\d+)|([A-Za-z])|([-+*/^()])|(\s+)|(.)")
+
+def _tokenize(string):
+    """Returns the list of tokens in STRING, in one pass, as triples
+    (kind, text, position), where kind is "number", "name", the
+    operator or parenthesis itself, or "end" for the token added after
+    the last one. Whitespace is skipped.
+    """
+    tokens = []
+    for match in _TOKEN.finditer(string):
+        group = match.lastindex
+        if group == 4:
+            continue
+        text = match.group()
+        if group == 5:
+            raise ExpressionSyntaxError(
+                "Unexpected character {!r}".format(text), string, match.start()
+            )
+        kind = "number" if group == 1 else "name" if group == 2 else text
+        tokens.append((kind, text, match.start()))
+    tokens.append(("end", "", len(string)))
+    return tokens
+
 def str_to_expression(string):
     """Returns the expression described by the string.
+
+    Terms are separated by + and -, and factors by * and /. Factors
+    written next to each other, like the integer and variables in
+    "6xy", are multiplied before * and / are applied, so "x/2y" is x
+    divided by 2y. A factor may be an integer, a one-letter variable,
+    or an expression in parentheses, raised to an integer power with ^.
+    The string is read in a single pass.
+
     >>> str(str_to_expression("6xy"))
     '6xy'
     >>> str(str_to_expression("6xy+2"))
     '6xy + 2'
     >>> str(str_to_expression("2b- 2"))
     '2b - 2'
+    >>> print(str_to_expression("(a + b)^2 / 2a^-1").simplified())
+    (aaa + 2aab + abb)/2
+    >>> str_to_expression("2(a + b")
+    Traceback (most recent call last):
+    ...
+    RationalExpression.ExpressionSyntaxError: Expected ')' at position 7:
+    2(a + b
+           ^
+    >>> str(str_to_expression("--x"))
+    'x'
+    >>> str_to_expression("(" * 5000 + "x" + ")" * 5000)  # doctest: +ELLIPSIS
+    Traceback (most recent call last):
+    ...
+    RationalExpression.ExpressionSyntaxError: Expression nested too deeply at position ...
     """
-    string = string.strip()
-    operators = [
-        ("+", AdditionExpression, lambda x: x),
-        ("*", MultiplicationExpression, lambda x: x),
-        ("/", MultiplicationExpression, ReciprocalExpression),
-        (
-            "-",
-            AdditionExpression,
-            lambda x: MultiplicationExpression(SimpleExpression(-1), x)
-        )
-    ]
-    for op in operators:
-        if op[0] in string:
-            parts = string.split(op[0])
-            return op[1](
-                str_to_expression(parts[0]),
-                *[
-                    op[2](str_to_expression(part))
-                    for part in parts[1:]
-                ]
-            )
-    # Means that this string contains no explicit operators
-    factors = []
-    for token in maths.get_math_tokens_from_string(string):
-        if type(token) == int: # This factor is an integer.
-            for prime in maths.get_prime_factors(token):
-                factors.append(prime)
-        else: # This factor is an variable.
-            factors.append(token)
-    factors = [SimpleExpression(factor) for factor in factors]
-    return MultiplicationExpression(*factors)
+    return _Parser(string).parse()
+
+class _Parser:
+    """Reads an expression from a string by recursive descent, with one
+    method per level of precedence, building the expression as it goes.
+    """
+    def __init__(self, string):
+        self.string = string
+        self.tokens = _tokenize(string)
+        self.index = 0
+    def peek(self):
+        """Returns the next token without consuming it."""
+        return self.tokens[self.index]
+    def next(self):
+        """Consumes and returns the next token."""
+        token = self.tokens[self.index]
+        self.index += 1
+        return token
+    def error(self, message, token):
+        """Returns an ExpressionSyntaxError with MESSAGE at TOKEN."""
+        return ExpressionSyntaxError(message, self.string, token[2])
+    def parse(self):
+        """Returns the expression that makes up the whole string."""
+        try:
+            expr = self.sum()
+        except RecursionError:
+            raise self.error("Expression nested too deeply", self.peek()) from None
+        token = self.peek()
+        if token[0] != "end":
+            raise self.error("Unexpected {!r}".format(token[1]), token)
+        return expr
+    def sum(self):
+        """Reads terms separated by + and -."""
+        terms = [self.product()]
+        while self.peek()[0] in ("+", "-"):
+            operator = self.next()[0]
+            term = self.product()
+            terms.append(term if operator == "+" else _negated(term))
+        return terms[0] if len(terms) == 1 else AdditionExpression(*terms)
+    def product(self):
+        """Reads factors separated by * and /."""
+        factors = [self.juxtaposition()]
+        while self.peek()[0] in ("*", "/"):
+            operator = self.next()[0]
+            factor = self.juxtaposition()
+            factors.append(factor if operator == "*" else ReciprocalExpression(factor))
+        return factors[0] if len(factors) == 1 else MultiplicationExpression(*factors)
+    def juxtaposition(self):
+        """Reads factors written next to each other, with any number of
+        signs in front; an odd number of minus signs negates them.
+        """
+        negative = False
+        while self.peek()[0] in ("+", "-"):
+            negative ^= self.next()[0] == "-"
+        factors = [self.power()]
+        while self.peek()[0] in ("number", "name", "("):
+            factors.append(self.power())
+        factor = factors[0] if len(factors) == 1 else MultiplicationExpression(*factors)
+        return _negated(factor) if negative else factor
+    def power(self):
+        """Reads a factor, raised to an integer power if ^ follows."""
+        base = self.atom()
+        if self.peek()[0] != "^":
+            return base
+        self.next()
+        negative = self.peek()[0] == "-"
+        if negative:
+            self.next()
+        token = self.next()
+        if token[0] != "number":
+            raise self.error("Expected an integer exponent", token)
+        exponent = int(token[1])
+        if not exponent:
+            return SimpleExpression(1)
+        power = base if exponent == 1 else MultiplicationExpression(*[base] * exponent)
+        return ReciprocalExpression(power) if negative else power
+    def atom(self):
+        """Reads an integer, a variable, or an expression in
+        parentheses.
+        """
+        token = self.next()
+        if token[0] == "number":
+            return SimpleExpression(int(token[1]))
+        if token[0] == "name":
+            return SimpleExpression(token[1])
+        if token[0] == "(":
+            expr = self.sum()
+            closing = self.next()
+            if closing[0] != ")":
+                raise self.error("Expected ')'", closing)
+            return expr
+        raise self.error("Expected a number, a variable or '('", token)
+
+def _negated(expr):
+    """Returns the expression for -1 times EXPR."""
+    return MultiplicationExpression(SimpleExpression(-1), expr)
+
 class RationalExpression:
     """Exactly represents an expression whose value is a rational
     number.
+
+    Expressions are immutable and hash-consed: creating an expression
+    that is structurally identical to a live one returns the existing
+    object, so identical subexpressions are shared and two expressions
+    are equal exactly when they are the same object. Hashing and
+    equality are therefore by identity and take constant time.
+
+    >>> str_to_expression("ab + 2") is str_to_expression("ab + 2")
+    True
+    >>> x = SimpleExpression("x")
+    >>> (x * x)[0] is (x * x)[1] is x
+    True
     """
+    __slots__ = ("__weakref__", "_memo")
     def __add__(self, other):
         """Returns a new expression representing the sum of two
         expressions.
@@ -105,7 +323,7 @@ class RationalExpression:
         expressions.
         """
         return MultiplicationExpression(self, other)
-    def __div__(self, other):
+    def __truediv__(self, other):
         """Returns a new expression representing the quotient of two
         expressions.
         """
@@ -114,21 +332,89 @@ class RationalExpression:
         """Returns a new expression representing the difference of two
         expressions.
         """
-        return AdditionExpression(self, MultiplicationExpression(-1, other))
+        return AdditionExpression(
+            self, MultiplicationExpression(SimpleExpression(-1), other)
+        )
     def simplified(self):
-        """Returns an equivalent expression."""
-        return self
+        """Returns the canonical form of this expression: a sum of terms
+        in canonical order (see Polynomial.sorted_terms), each an integer
+        coefficient times variables, over a single such sum if the
+        expression has a denominator. Products are distributed, like
+        terms combined, and common factors of the numerator and
+        denominator cancelled.
+
+        Results are kept in the shared cache, so simplifying an
+        expression again, or an expression built from the same parts,
+        costs one lookup.
+
+        >>> a, b = SimpleExpression("a"), SimpleExpression("b")
+        >>> print(((a + b) * (a - b) / (a + b)).simplified())
+        a - b
+        >>> print(str_to_expression("1/x + 1/y").simplified())
+        (x + y)/xy
+        >>> hits = cache.hits
+        >>> print(str_to_expression("1/x + 1/y").simplified())
+        (x + y)/xy
+        >>> cache.hits - hits
+        1
+        """
+        return cache.get((self, "simplified"), lambda: (
+            RationalExpression.from_rational_function(self.rational_function())
+        ))
+    def rational_function(self):
+        """Returns the RationalFunction equal to this expression. Like
+        simplified forms, these are kept in the shared cache, so a
+        subexpression shared by many expressions is converted once.
+        """
+        return cache.get((self, "rational_function"), self._rational_function)
+    def _rational_function(self):
+        """Returns the RationalFunction equal to this expression, without
+        looking in the cache.
+        """
+        raise NotImplementedError
+    def eval(self):
+        """Returns the inexact float representation of the expression,
+        or None if it has variables. The value is remembered by the
+        expression.
+
+        >>> str_to_expression("2 * 3 + 1/4").eval()
+        6.25
+        """
+        return self._memoized("eval", self._eval)
+    def _memoized(self, name, compute):
+        """Returns the value remembered by this expression under NAME,
+        first setting it to the result of calling COMPUTE if there is
+        none. Expressions are immutable, so it never goes stale.
+        """
+        memo = self._memo
+        if memo is None:
+            memo = self._memo = {}
+        if name not in memo:
+            memo[name] = compute()
+        return memo[name]
+    @classmethod
+    def from_rational_function(cls, function):
+        """Returns the expression for the RationalFunction FUNCTION, in
+        the form described by simplified.
+        """
+        numerator = _polynomial_expression(function.numerator)
+        if function.denominator == 1:
+            return numerator
+        return MultiplicationExpression(numerator, ReciprocalExpression(
+            _polynomial_expression(function.denominator)
+        ))
     def package(self):
         """Returns a hashable representation of SELF containing all
         information necessary to reconstruct an expression
-        equivalent to SELF.
+        equivalent to SELF. This is the simplified expression itself,
+        which is hashed by identity.
         """
-        return str(self.simplified())
+        return self.simplified()
     @classmethod
     def unpackage(cls, package):
         """Returns an expression recovered from the hashable form of an
         expression."""
-        return str_to_expression(package)
+        return package
     def var_string(self):
         """Returns a string representation of the variables in the
         expression only (no operators, spaces, or coefficients)
@@ -139,12 +425,38 @@ class RationalExpression:
             character for character in str(self)
             if character.isalpha()
         )
+    def evaluate(self, bindings, values=None):
+        """Returns the value of this expression when each variable has
+        the value given for it in the dictionary BINDINGS, by walking the
+        expression. VALUES maps the subexpressions already evaluated to
+        their values, so each shared subexpression is evaluated once.
+        Integers stay exact unless they are divided.
+
+        >>> str_to_expression("(x + y)/2x").evaluate({"x": 2, "y": 6})
+        2.0
+        """
+        if values is None:
+            values = {}
+        if self not in values:
+            values[self] = self._evaluate(bindings, values)
+        return values[self]
+    def compile(self):
+        """Returns this expression compiled into a CompiledExpression,
+        which evaluates it much faster than evaluate, and over many
+        bindings at once. The result is remembered by the expression.
+
+        >>> f = str_to_expression("(x + y)/2x").compile()
+        >>> f.variables, f(2, 6)
+        (('x', 'y'), 2.0)
+        """
+        return self._memoized("compiled", lambda: CompiledExpression(self))
 
 
 class CompoundExpression(RationalExpression):
     """Represents an expression that includes other expressions."""
-    def __init__(self, *subexpressions):
-        """Initializes an expression with the subexpressions that it
+    __slots__ = ("subexpressions",)
+    def __new__(cls, *subexpressions):
+        """Returns the expression with the subexpressions that it
         comprises (all of which must be RationalExpressions)
         """
         assert len(subexpressions) > 0, "An expression must have contents."
@@ -152,7 +464,7 @@ class CompoundExpression(RationalExpression):
             isinstance(expr, RationalExpression) for expr in subexpressions
             ), "The elements of {} are not all of type \
                 RationalExpression.".format(subexpressions)
-        self.subexpressions = list(subexpressions)
+        return _node(cls, subexpressions, subexpressions=subexpressions)
     def __getitem__(self, key):
         """Returns the term corresponding to a given index."""
         return self.subexpressions[key]
@@ -161,8 +473,12 @@ class CompoundExpression(RationalExpression):
         return len(self.subexpressions)
     def unlayered(self):
         """Returns an equivalent expression that contains the fewest
-        distinct operations possible.
+        distinct operations possible. The result is remembered by the
+        expression.
         """
+        return self._memoized("unlayered", self._unlayered)
+    def _unlayered(self):
+        """Returns the result of unlayered, without looking it up."""
         return type(self)(*[
             item.unlayered()
             for item in self
@@ -172,10 +488,23 @@ class CompoundExpression(RationalExpression):
 class AdditionExpression(CompoundExpression):
     """Represents the sum of an arbitrary number of terms.
     """
+    __slots__ = ()
     def __str__(self):
-        """Returns the string representation of this expression."""
-        return "(" + " + ".join(str(term) for term in self.subexpressions) + ")"
-    
+        """Returns the string representation of this expression, with
+        a term that has a negative coefficient written as a subtraction.
+
+        >>> x = SimpleExpression("x")
+        >>> str(x + SimpleExpression(2) * x - x)
+        '(x + 2x) - x'
+        """
+        parts = []
+        for term in self.subexpressions:
+            text = _operand(term, AdditionExpression)
+            if parts and text.startswith("-"):
+                parts.append("- " + text[1:])
+            else:
+                parts.append(("+ " if parts else "") + text)
+        return " ".join(parts)
     def simplified(self):
         """Returns a simpler equivalent expression, where expressions
         involving variables are in alphabetical order and constant
@@ -192,145 +521,312 @@ class AdditionExpression(CompoundExpression):
         >>> print(str_to_expression("aa + a + ab").simplified())
         a + aa + ab
         """
-        unlayered = AdditionExpression.unlayered(self)
-        constants = []
-        like_terms = dict()
-        for term in unlayered:
-            coefficient_factors = [
-                factor for factor in term
-                if factor.eval() is not None
-            ]
-            if not coefficient_factors:
-                coefficient_factors = [SimpleExpression(1)]
-            non_coefficient_factors = [
-                factor for factor in term
-                if factor.eval() is None
-            ]
-            if len(non_coefficient_factors) == 0:
-                constants.append(
-                    MultiplicationExpression(*coefficient_factors)
-                )
-            else:
-                id = MultiplicationExpression(
-                    *non_coefficient_factors
-                ).package()
-                if id not in like_terms:
-                    like_terms[id] = list()
-                like_terms[id].append(MultiplicationExpression(
-                    *coefficient_factors
-                ))
-        print("DEBUG: like_terms:", like_terms)
-        terms = utils.sorted([
-            MultiplicationExpression(
-                AdditionExpression(*like_terms[id]),
-                MultiplicationExpression(RationalExpression.unpackage(
-                    id
-                ))
-            )
-            for id in like_terms
-        ], lambda expr: str(expr))
-        if constants:
-            terms.append(AdditionExpression(*constants))
-        return AdditionExpression(*terms).unlayered()
-        # # Expand into a series of terms
-        # terms = [term.simplified() for term in self.subexpressions]
-        # terms = unpack(terms, AdditionExpression)
-        # # Combine like terms
-        # indexed_terms = get_like_terms(terms)
-        # resulting_terms = list()
-        # for numerator in indexed_terms:
-        #     for denominator in indexed_terms[numerator]:
-        #         coeff = AdditionExpression(
-        #             *[
-        #                 term.simplified() for term in
-        #                 indexed_terms[numerator][denominator]
-        #             ]
-        #         )
-        #         numerator = RationalExpression.unpackage(numerator)
-        #         denominator = RationalExpression.unpackage(denominator)
-        #         parts = []
-        #         if not coeff.is_empty():
-        #             parts.append(coeff)
-        #         if not numerator.is_empty():
-        #             parts.append(numerator)
-        #         if not denominator.is_empty():
-        #             print("DEBUG: denominator.subexpressions =", denominator.subexpressions)
-        #             parts.append(
-        #                 ReciprocalExpression(denominator)
-        #             )
-        #         resulting_terms.append(MultiplicationExpression(*parts))
-        # resulting_terms = sorted(
-        #     resulting_terms,
-        #     key=lambda expr: expr.var_string()
-        # )
-        # if len(resulting_terms) > 0:
-        #     return AdditionExpression(*resulting_terms)
-        # else:
-        #     return resulting_terms[0]
-    def eval(self):
+        return super().simplified()
+    def _rational_function(self):
+        """Returns the RationalFunction equal to this expression."""
+        return RationalFunction.sum(
+            term.rational_function() for term in self.subexpressions
+        )
+    def _eval(self):
         """Returns the inexact float representation of the expression."""
         term_values = [term.eval() for term in self.subexpressions]
         return None if None in term_values else sum(term_values)
-    def unlayered(self):
+    def _evaluate(self, bindings, values):
+        return sum(term.evaluate(bindings, values) for term in self.subexpressions)
+    def _unlayered(self):
         """Returns an equivalent expression that contains the fewest
         distinct operations possible.
         """
         if len(self) == 1:
             return self[0]
-        return super().unlayered()
+        return super()._unlayered()
 class MultiplicationExpression(CompoundExpression):
     """Represents a product of 1 and one or more rational
     expressions.
     """
+    __slots__ = ()
     def __str__(self):
-        """Returns the string representation of this expression."""
-        return "*".join(str(factor) for factor in self.subexpressions)
+        """Returns the string representation of this expression: the
+        product of its integer factors, then its other factors written
+        next to each other, then a slash and the factors of its
+        denominator, if it has any.
+
+        >>> str(str_to_expression("2 * 3 * x / y"))
+        '6x/y'
+        """
+        coefficient, numerator, denominator = self._split()
+        text = "".join(_operand(factor) for factor in numerator)
+        if coefficient == -1 and text:
+            text = "-" + text
+        elif coefficient != 1 or not text:
+            text = str(coefficient) + text
+        if denominator:
+            text += "/" + "".join(_operand(factor) for factor in denominator)
+        return text
+    def _split(self):
+        """Returns a triple (coefficient, numerator, denominator): the
+        product of the integer factors of this expression, and lists of
+        its other factors and of the denominators of its reciprocal
+        factors, looking inside nested products.
+        """
+        coefficient = 1
+        numerator = []
+        denominator = []
+        for factor in self.subexpressions:
+            if isinstance(factor, MultiplicationExpression):
+                inner, above, below = factor._split()
+                coefficient *= inner
+                numerator += above
+                denominator += below
+            elif isinstance(factor, SimpleExpression) and isinstance(factor.value, int):
+                coefficient *= factor.value
+            elif isinstance(factor, ReciprocalExpression):
+                denominator.append(factor.denominator)
+            else:
+                numerator.append(factor)
+        return coefficient, numerator, denominator
     def simplified(self):
         """Returns a simpler equivalent expression in the form
         of a sum of non-combinable terms.
+
+        >>> a, b = SimpleExpression("a"), SimpleExpression("b")
+        >>> print(((a + b) * (a + SimpleExpression(2))).simplified())
+        2a + aa + ab + 2b
         """
-        unlayered = self.unlayered()
-        # TODO: Apply distributive property
-        return unlayered
-    def eval(self):
+        return super().simplified()
+    def _rational_function(self):
+        """Returns the RationalFunction equal to this expression."""
+        product = RationalFunction(1)
+        for factor in self.subexpressions:
+            product *= factor.rational_function()
+        return product
+    def _eval(self):
         """Returns the inexact float representation of the expression."""
         factor_values = [factor.eval() for factor in self.subexpressions]
         return None if None in factor_values else maths.product(factor_values)
+    def _evaluate(self, bindings, values):
+        return maths.product(
+            factor.evaluate(bindings, values) for factor in self.subexpressions
+        )
 class ReciprocalExpression(RationalExpression):
     """Represents the reciprocal of another expression."""
-    def __init__(self, denominator):
-        """Creates an expression representing the reciprocal of
+    __slots__ = ("denominator",)
+    def __new__(cls, denominator):
+        """Returns the expression representing the reciprocal of
         DENOMINATOR."""
-        self.denominator = denominator
+        return _node(cls, denominator, denominator=denominator)
     def __str__(self):
         """Returns the string representation of this expression."""
-        return "1 / " + str(self.denominator)
-    def eval(self):
+        return "1/" + _operand(self.denominator)
+    def _rational_function(self):
+        """Returns the RationalFunction equal to this expression."""
+        return 1 / self.denominator.rational_function()
+    def _eval(self):
         """Returns the inexact float representation of the
         expression.
         """
-        return None if self.denominator is None else 1 / self.denominator
+        value = self.denominator.eval()
+        return None if value is None else 1 / value
+    def _evaluate(self, bindings, values):
+        return 1 / self.denominator.evaluate(bindings, values)
+    def unlayered(self):
+        """Returns an equivalent expression that contains the fewest
+        distinct operations possible.
+        """
+        return ReciprocalExpression(self.denominator.unlayered())
 class SimpleExpression(RationalExpression):
-    """Represents an atomic expression -- either a prime number or a
+    """Represents an atomic expression -- either an integer or a
     variable.
     """
-    def __init__(self, value):
-        """Initializes this SimpleExpression with the single value that
-        it contains.
+    __slots__ = ("value",)
+    def __new__(cls, value):
+        """Returns the SimpleExpression with the single value that it
+        contains.
         """
-        self.value = value
+        # The type is part of the key so that, say, 1 and True differ
+        return _node(cls, (type(value), value), value=value)
     def __str__(self):
         """Returns the string representation of this expression."""
         return str(self.value)
+    def simplified(self):
+        """Returns this expression, which is already as simple as
+        possible.
+        """
+        return self
+    def _rational_function(self):
+        """Returns the RationalFunction equal to this expression."""
+        if isinstance(self.value, int):
+            return RationalFunction(self.value)
+        return RationalFunction(Polynomial.variable(self.value))
     def eval(self):
         """Returns the float approximation of the numerical value of
-        this expression, if that numerical value is known.
+        this expression, if that numerical value is known. This is
+        cheap enough that it is not remembered.
         """
         return self.value if isinstance(self.value, int) else None
+    def evaluate(self, bindings, values=None):
+        """Returns the integer in this expression, or the value of its
+        variable in BINDINGS.
+        """
+        if isinstance(self.value, int):
+            return self.value
+        assert self.value in bindings, "No value given for {}.".format(self.value)
+        return bindings[self.value]
     def unlayered(self):
         """Returns an equivalent expression that contains the fewest
         distinct operations possible. In a SimpleExpression, there are
         already 0 operations, which is the minimum theoretically
         possible.
         """
-        return self
\ No newline at end of file
+        return self
+
+def _operand(expr, within=MultiplicationExpression):
+    """Returns the string representation of EXPR as an operand of an
+    expression of type WITHIN, in parentheses if it would otherwise be
+    read differently.
+    """
+    text = str(expr)
+    if isinstance(expr, SimpleExpression) and text.isalnum():
+        return text
+    if within is AdditionExpression and not isinstance(expr, AdditionExpression):
+        return text
+    if within is MultiplicationExpression and text.isalnum():
+        return text
+    return "(" + text + ")"
+
+def _polynomial_expression(polynomial):
+    """Returns the expression for POLYNOMIAL: the sum of its terms in
+    canonical order, each a product of its coefficient (unless it is 1)
+    and its variables.
+    """
+    terms = []
+    for monomial, coefficient in polynomial.sorted_terms():
+        factors = [
+            SimpleExpression(name)
+            for name, exponent in monomial for i in range(exponent)
+        ]
+        if coefficient != 1 or not factors:
+            factors.insert(0, SimpleExpression(coefficient))
+        terms.append(
+            factors[0] if len(factors) == 1 else MultiplicationExpression(*factors)
+        )
+    if not terms:
+        return SimpleExpression(0)
+    return terms[0] if len(terms) == 1 else AdditionExpression(*terms)
+
+class CompiledExpression:
+    """Describes an expression lowered to a flat list of instructions,
+    one per distinct subexpression in the order they are needed, so a
+    subexpression shared by several parts of the expression is computed
+    once. The instructions are turned into a Python function of the
+    variables, which works on numbers and, elementwise, on NumPy
+    arrays.
+
+    >>> f = str_to_expression("(x + 1)(x + 1) + 1/(x + 1)").compile()
+    >>> f.instructions
+    [('variable', 'x'), ('constant', 1), ('add', 0, 1), ('multiply', 2, 2), ('reciprocal', 2), ('multiply', 1, 4), ('add', 3, 5)]
+    >>> f(1)
+    4.5
+    """
+    # The most operands combined in one statement of the generated code
+    chunk_size = 32
+    def __init__(self, expr):
+        """Compiles the expression EXPR."""
+        # Each instruction is (operation, operand, ...), where operands
+        # are the (0-based) indices of earlier instructions, except for
+        # a "constant" (whose operand is the integer) and a "variable"
+        # (whose operand is its name)
+        self.instructions = []
+        registers = {}
+        names = set()
+        stack = [(expr, False)]
+        while stack:
+            node, ready = stack.pop()
+            if node in registers:
+                continue
+            parts = (
+                node.subexpressions if isinstance(node, CompoundExpression)
+                else (node.denominator,) if isinstance(node, ReciprocalExpression)
+                else ()
+            )
+            if not ready:
+                stack.append((node, True))
+                stack.extend((part, False) for part in reversed(parts))
+                continue
+            if isinstance(node, SimpleExpression):
+                if isinstance(node.value, int):
+                    instruction = ("constant", node.value)
+                else:
+                    instruction = ("variable", node.value)
+                    names.add(node.value)
+            else:
+                operation = (
+                    "add" if isinstance(node, AdditionExpression)
+                    else "multiply" if isinstance(node, MultiplicationExpression)
+                    else "reciprocal"
+                )
+                instruction = (operation, *[registers[part] for part in parts])
+            registers[node] = len(self.instructions)
+            self.instructions.append(instruction)
+        self.variables = tuple(sorted(names))
+        self.source = self._source()
+        namespace = {}
+        exec(compile(self.source, "<compiled expression>", "exec"), namespace)
+        self.function = namespace["evaluate"]
+    def _source(self):
+        """Returns the Python source code of a function named evaluate
+        that carries out the instructions, with one argument per
+        variable.
+        """
+        arguments = {name: "v{}".format(i) for i, name in enumerate(self.variables)}
+        lines = ["def evaluate({}):".format(", ".join(arguments.values()))]
+        symbols = {"add": " + ", "multiply": " * "}
+        for i, (operation, *operands) in enumerate(self.instructions):
+            target = "r{}".format(i)
+            if operation == "constant":
+                lines.append("    {} = {!r}".format(target, operands[0]))
+            elif operation == "variable":
+                lines.append("    {} = {}".format(target, arguments[operands[0]]))
+            elif operation == "reciprocal":
+                lines.append("    {} = 1 / r{}".format(target, operands[0]))
+            else:
+                # Long sums and products are built up a chunk at a time
+                # to keep each statement shallow
+                names = ["r{}".format(operand) for operand in operands]
+                for start in range(0, len(names), self.chunk_size):
+                    chunk = names[start:start + self.chunk_size]
+                    if start:
+                        chunk.insert(0, target)
+                    lines.append("    {} = {}".format(target, symbols[operation].join(chunk)))
+        lines.append("    return r{}".format(len(self.instructions) - 1))
+        return "\n".join(lines) + "\n"
+    def __call__(self, *values, **bindings):
+        """Returns the value of the expression for the VALUES of its
+        variables, in the order of self.variables, or for the given
+        keyword BINDINGS. Values may be numbers or NumPy arrays.
+        """
+        if bindings:
+            values = [bindings[name] for name in self.variables]
+        return self.function(*values)
+    def evaluate_many(self, bindings):
+        """Returns the values of the expression at many points at once.
+        BINDINGS maps each variable to a sequence of values, one per
+        point. With NumPy, the whole computation runs on arrays and an
+        array is returned; without it, the compiled function is called
+        once per point and a list is returned.
+
+        >>> f = str_to_expression("xy + 1").compile()
+        >>> list(map(float, f.evaluate_many({"x": [1, 2, 3], "y": [4, 5, 6]})))
+        [5.0, 11.0, 19.0]
+        """
+        columns = [bindings[name] for name in self.variables]
+        num_points = len(columns[0]) if columns else 1
+        try:
+            import numpy
+        except ImportError:
+            return [float(self.function(*point)) for point in zip(*columns)] \
+                if columns else [float(self.function())]
+        arrays = [numpy.asarray(column, dtype=float) for column in columns]
+        return numpy.broadcast_to(
+            numpy.asarray(self.function(*arrays), dtype=float), (num_points,)
+        )
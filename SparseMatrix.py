@@ -0,0 +1,509 @@
+from fractions import Fraction
+
+from Matrix import Matrix, is_negligible, view_position
+
+class SparseMatrix(Matrix):
+    """
+    Describes a 2D matrix that stores only its nonzero entries, as one
+    dictionary per row mapping (0-based) column numbers to values. Row
+    operations and elimination only visit stored entries, so banded and
+    other mostly-zero matrices take memory and time in proportion to
+    their nonzeros rather than their full size.
+    """
+    # During elimination, any entry at least this fraction of the largest
+    # candidate (in magnitude) may be the pivot; among those, the row with
+    # the fewest nonzeros is chosen to limit fill-in.
+    pivot_threshold = 0.1
+    def __init__(self, contents=None, num_cols=None):
+        """
+        CONTENTS may be a list of dense rows, another Matrix, or a list of
+        dictionaries mapping (0-based) column numbers to entries, in which
+        case NUM_COLS should be given. Zero entries are not stored. If
+        contents is None, the matrix is created using user input.
+
+        >>> mat = SparseMatrix([[1, 0, 0], [0, 0, 2]])
+        >>> mat.contents
+        [{0: 1}, {2: 2}]
+        >>> SparseMatrix([{1: 5}], num_cols=4)[0]
+        [0, 5, 0, 0]
+        """
+        if contents is None:
+            contents = Matrix().contents
+        elif isinstance(contents, Matrix):
+            num_cols = contents.num_cols()
+            if not isinstance(contents, SparseMatrix):
+                contents = [contents[i] for i in range(len(contents))]
+            else:
+                contents = contents.contents
+        self.contents = []
+        for row in contents:
+            if not isinstance(row, dict):
+                if num_cols is None:
+                    num_cols = len(row)
+                row = dict(enumerate(row))
+            self.contents.append({j: entry for j, entry in row.items() if entry != 0})
+        if num_cols is None:
+            num_cols = 1 + max((max(row, default=-1) for row in self.contents), default=-1)
+        self._num_cols = num_cols
+    def __getitem__(self, key):
+        """
+        Returns row number KEY (0-based), as a SparseRow that reads and
+        writes the stored entries, or the entry at KEY if it is a
+        (0-based) pair (row, col).
+
+        >>> mat = SparseMatrix([[1, 0], [0, 4]])
+        >>> mat[1, 1]
+        4
+        >>> mat[0][1] = 5
+        >>> mat[1][1] = 0
+        >>> mat.contents
+        [{0: 1, 1: 5}, {}]
+        """
+        if isinstance(key, tuple):
+            return self.contents[key[0]].get(key[1] % self._num_cols, 0)
+        if isinstance(key, slice):
+            return [self[i] for i in range(*key.indices(len(self)))]
+        return SparseRow(self.contents[key], self._num_cols, self)
+    def __setitem__(self, key, value):
+        """
+        Sets the entries of row number KEY (0-based) to those of the list
+        VALUE, or, if KEY is a (0-based) pair (row, col), sets the entry
+        there to VALUE.
+
+        This is a side effect; return type is None.
+
+        >>> mat = SparseMatrix([[1, 0], [0, 4]])
+        >>> mat[0, 1] = 5
+        >>> mat[1] = [0, 0]
+        >>> mat.contents
+        [{0: 1, 1: 5}, {}]
+        """
+        if isinstance(key, tuple):
+            row, col = self.contents[key[0]], key[1] % self._num_cols
+            if value != 0:
+                row[col] = value
+            else:
+                row.pop(col, None)
+        else:
+            assert len(value) == self._num_cols, \
+                "Expected {} entries, got {}.".format(self._num_cols, len(value))
+            self.contents[key] = {j: entry for j, entry in enumerate(value) if entry != 0}
+        self._changed()
+    def num_cols(self):
+        """
+        Returns the number of columns in this matrix.
+        """
+        return self._num_cols
+    def column(self, col):
+        """
+        Returns a list of the entries in the (0-based) column COL.
+
+        >>> SparseMatrix([[1, 0, 3], [0, 0, 6]]).column(-1)
+        [3, 6]
+        """
+        if col < 0:
+            col += self._num_cols
+        return [row.get(col, 0) for row in self.contents]
+    def transpose(self):
+        """
+        Returns the transpose of this matrix.
+
+        >>> SparseMatrix([[1, 0, 3], [0, 5, 0]]).transpose().contents
+        [{0: 1}, {1: 5}, {0: 3}]
+        """
+        rows = [dict() for j in range(self._num_cols)]
+        for i, row in enumerate(self.contents):
+            for j, entry in row.items():
+                rows[j][i] = entry
+        return SparseMatrix(rows, len(self.contents))
+    def matvec(self, vector):
+        """
+        Returns the product of this matrix and the column VECTOR, as a list,
+        visiting only the stored entries.
+
+        >>> SparseMatrix([[1, 0, 3], [0, 5, 0]]).matvec([1, 1, 1])
+        [4, 5]
+        """
+        assert len(vector) == self._num_cols, \
+            "Expected {} entries, got {}.".format(self._num_cols, len(vector))
+        return [
+            sum(entry * vector[j] for j, entry in row.items()) for row in self.contents
+        ]
+    def __matmul__(self, other):
+        """
+        Returns the product of this matrix and OTHER: a SparseMatrix if
+        OTHER is a Matrix, or a list if it is a column vector. Each stored
+        entry of this matrix is multiplied only by the stored entries of
+        the matching row of OTHER.
+
+        >>> (SparseMatrix([[1, 0], [0, 2]]) @ Matrix([[1, 2], [3, 4]])).contents
+        [{0: 1, 1: 2}, {0: 6, 1: 8}]
+        """
+        if not isinstance(other, Matrix):
+            return self.matvec(other)
+        assert self._num_cols == len(other), \
+            "Cannot multiply a matrix with {} columns by one with {} rows.".format(
+                self._num_cols, len(other)
+            )
+        if not isinstance(other, SparseMatrix):
+            other = SparseMatrix(other)
+        rows = []
+        for row in self.contents:
+            out = dict()
+            for k, entry in row.items():
+                for j, other_entry in other.contents[k].items():
+                    out[j] = out.get(j, 0) + entry * other_entry
+            rows.append(out)
+        return SparseMatrix(rows, other.num_cols())
+    def to_dense(self):
+        """
+        Returns a Matrix with the same entries as this one.
+        """
+        return Matrix([self[i] for i in range(len(self))])
+    def submatrix(self, start_row=1, start_col=1, end_row=None, end_col=None):
+        """
+        Returns a part of the matrix represented by this matrix.
+        Boundaries are inclusive.
+
+        >>> mat = SparseMatrix([[1, 0, 3], [0, 5, 0], [7, 0, 9]])
+        >>> mat.submatrix(2, 2).contents
+        [{0: 5}, {1: 9}]
+        """
+        assert start_row > 0, "start_row cannot be less than the minimum row number"
+        assert start_col > 0, "start_col cannot be less than the minimum column number"
+        if end_col == None: end_col = self._num_cols
+        first = start_col - 1
+        return SparseMatrix(
+            [
+                {j - first: entry for j, entry in row.items() if first <= j < end_col}
+                for row in self.contents[start_row - 1:end_row]
+            ],
+            max(end_col - first, 0)
+        )
+    def insert(self, other, position):
+        """
+        Writes the values from another matrix (OTHER) into this one, in
+        place, and returns self. Values that would fall outside this
+        matrix are ignored.
+        Position: Ordered pair with the row and column at which the other
+        matrix should be inserted.
+
+        >>> mat = SparseMatrix([[1, 0, 3], [0, 5, 0]])
+        >>> mat.insert(Matrix([[0, 8]]), (2, 2)).contents
+        [{0: 1, 2: 3}, {2: 8}]
+        """
+        assert len(position) == 2
+        assert min(*position) >= 1
+        offset = (position[0] - 1, position[1] - 1)
+        for i in range(min(len(other), len(self) - offset[0])):
+            row = self.contents[i + offset[0]]
+            for j, entry in enumerate(other[i][:self._num_cols - offset[1]]):
+                if entry != 0:
+                    row[j + offset[1]] = entry
+                else:
+                    row.pop(j + offset[1], None)
+        self._changed()
+        return self
+    def append(self, row):
+        """
+        Adds ROW, a list of entries or a dictionary mapping (0-based)
+        column numbers to entries, to the bottom of this matrix.
+
+        This is a side effect; return type is None.
+
+        >>> mat = SparseMatrix([[1, 0]])
+        >>> mat.append([0, 4])
+        >>> mat.contents
+        [{0: 1}, {1: 4}]
+        """
+        if not isinstance(row, dict):
+            assert len(row) == self._num_cols, \
+                "Expected {} entries, got {}.".format(self._num_cols, len(row))
+            row = dict(enumerate(row))
+        self.contents.append({j: entry for j, entry in row.items() if entry != 0})
+        self._changed()
+    def replace(self, row_to_mutate, mutator_row, scale):
+        """
+        Replaces the content of the ROW_TO_MUTATE with its current values plus
+        the values in the MUTATOR_ROW times SCALE.
+
+        This is a side effect; return type is None.
+
+        >>> mat = SparseMatrix([[1, 2, 0], [2, 0, 6]])
+        >>> mat.replace(2, 1, -2)
+        >>> mat.contents
+        [{0: 1, 1: 2}, {2: 6, 1: -4}]
+        """
+        assert min(row_to_mutate, mutator_row) > 0
+        row = self.contents[row_to_mutate - 1]
+        for j, entry in list(self.contents[mutator_row - 1].items()):
+            value = row.get(j, 0) + entry * scale
+            if value != 0:
+                row[j] = value
+            else:
+                row.pop(j, None)
+        self._changed()
+    def interchange(self, row_a, row_b):
+        """
+        Swaps ROW_A with ROW_B.
+
+        This is a side effect; return type is None.
+        """
+        assert min(row_a, row_b) > 0
+        if row_a == row_b: return
+        self.contents[row_a - 1], self.contents[row_b - 1] = \
+            self.contents[row_b - 1], self.contents[row_a - 1]
+        self._changed()
+    def scale(self, row_to_mutate, scale):
+        """
+        Replaces the content of the ROW_TO_MUTATE with its current values
+        times SCALE.
+
+        This is a side effect; return type is None.
+
+        >>> mat = SparseMatrix([[1, 0, 2]])
+        >>> mat.scale(1, 0.5)
+        >>> mat.contents
+        [{0: 0.5, 2: 1.0}]
+        """
+        row = self.contents[row_to_mutate - 1]
+        if scale == 0:
+            row.clear()
+        for j in row:
+            row[j] *= scale
+        self._changed()
+    def copy(self):
+        """
+        Returns a copy of this matrix.
+        """
+        return SparseMatrix([dict(row) for row in self.contents], self._num_cols)
+    def _rref(self, accuracy=2):
+        """
+        Computes the reduced row echelon form of this matrix for rref,
+        visiting only the stored entries above each pivot.
+
+        >>> SparseMatrix([[1, 3, 4, 7], [3, 9, 7, 6]]).rref(None).contents
+        [{0: Fraction(1, 1), 1: Fraction(3, 1), 3: Fraction(-5, 1)}, {2: Fraction(1, 1), 3: Fraction(3, 1)}]
+        """
+        mat = self.ref(accuracy)
+        pivots = self.pivots(accuracy)
+        rows = mat.contents
+        # Step 1: Scale all entries so that values in pivot positions are 1
+        for row, col in pivots:
+            mat.scale(row + 1, 1 / rows[row][col])
+        # Step 2: Create zeros above each pivot, working upwards so that
+        # each pivot row has already been cleared when it is used
+        rows_with_col = mat._column_index()
+        for row, col in reversed(pivots):
+            for i in [i for i in rows_with_col[col] if i < row]:
+                mat._eliminate(i, row, col, rows_with_col)
+        mat._drop_zeros()
+        return mat
+    def _drop_zeros(self):
+        """
+        Stops storing any entry that has become exactly zero.
+
+        This is a side effect; return type is None.
+        """
+        for row in self.contents:
+            for j in [j for j, entry in row.items() if entry == 0]:
+                del row[j]
+    def _column_index(self):
+        """
+        Returns a dictionary mapping each (0-based) column number to the
+        set of (0-based) row numbers that store an entry in that column.
+        """
+        index = dict()
+        for i, row in enumerate(self.contents):
+            for j in row:
+                index.setdefault(j, set()).add(i)
+        return index
+    def _eliminate(self, row, pivot_row, col, rows_with_col):
+        """
+        Subtracts the multiple of the row at (0-based) index PIVOT_ROW that
+        clears column COL from the row at index ROW, keeping the column
+        index ROWS_WITH_COL up to date.
+
+        Returns the multiplier used.
+        """
+        target = self.contents[row]
+        pivot = self.contents[pivot_row]
+        factor = target[col] / pivot[col]
+        for j, entry in pivot.items():
+            if j not in target:
+                target[j] = 0
+                rows_with_col.setdefault(j, set()).add(row)
+            target[j] -= factor * entry
+        del target[col]
+        rows_with_col[col].discard(row)
+        return factor
+    def _reduce(self, accuracy=2, steps=None):
+        """
+        Reduces this matrix to row echelon form in place. Works like
+        Matrix._reduce, but only visits the rows that store an entry in the
+        pivot column, and chooses among acceptable pivots the sparsest
+        row (threshold Markowitz pivoting) to keep fill-in low. The
+        multipliers recorded in STEPS are dictionaries keyed by row.
+
+        Returns the (0-based) pivot column of each pivot row, in order.
+        """
+        self._changed()
+        if accuracy is None:
+            for row in self.contents:
+                for j in row:
+                    row[j] = Fraction(row[j])
+        rows = self.contents
+        rows_with_col = self._column_index()
+        pivot_cols = []
+        pivot_row = 0
+        for col in range(self._num_cols):
+            if pivot_row >= len(rows):
+                break
+            candidates = [i for i in rows_with_col.get(col, ()) if i >= pivot_row]
+            if not candidates:
+                continue
+            largest = max(abs(rows[i][col]) for i in candidates)
+            if is_negligible(largest, accuracy):
+                continue
+            # Step 1: Move the sparsest row with an acceptable pivot to the top
+            row_with_pivot = min(
+                (
+                    i for i in candidates
+                    if abs(rows[i][col]) >= self.pivot_threshold * largest
+                ),
+                key=lambda i: (len(rows[i]), i)
+            )
+            self._move_row(row_with_pivot, pivot_row, rows_with_col)
+            # Step 2: Create zeros below the pivot
+            factors = dict()
+            for i in list(rows_with_col[col]):
+                if i > pivot_row:
+                    factors[i] = self._eliminate(i, pivot_row, col, rows_with_col)
+            if steps is not None:
+                steps.append((pivot_row, col, row_with_pivot, factors))
+            pivot_cols.append(col)
+            # Step 3: Repeat on the rows below
+            pivot_row += 1
+        self._drop_zeros()
+        return pivot_cols
+    def _move_row(self, row_a, row_b, rows_with_col):
+        """
+        Swaps the rows at (0-based) indices ROW_A and ROW_B, keeping the
+        column index ROWS_WITH_COL up to date.
+        """
+        if row_a == row_b:
+            return
+        for j in self.contents[row_a]:
+            rows_with_col[j].discard(row_a)
+        for j in self.contents[row_b]:
+            rows_with_col[j].discard(row_b)
+        self.interchange(row_a + 1, row_b + 1)
+        for j in self.contents[row_a]:
+            rows_with_col[j].add(row_a)
+        for j in self.contents[row_b]:
+            rows_with_col[j].add(row_b)
+    def _apply_steps(self, steps, column):
+        """
+        Returns a copy of COLUMN (one value per row of this matrix) after
+        the interchanges and replacements recorded in STEPS by _reduce
+        have been applied to it.
+        """
+        column = list(column)
+        for pivot_row, _, swapped_row, factors in steps:
+            column[pivot_row], column[swapped_row] = column[swapped_row], column[pivot_row]
+            pivot = column[pivot_row]
+            if pivot:
+                for i, factor in factors.items():
+                    column[i] -= factor * pivot
+        return column
+    def _replay(self, steps):
+        """
+        Applies the interchanges and replacements recorded in STEPS by
+        _reduce to the rows of this matrix.
+
+        This is a side effect; return type is None.
+        """
+        for pivot_row, _, swapped_row, factors in steps:
+            self.interchange(pivot_row + 1, swapped_row + 1)
+            for i, factor in factors.items():
+                self.replace(i + 1, pivot_row + 1, -factor)
+    def _back_substitute(self, pivots, column, solution=None):
+        """
+        Returns a solution of the echelon-form system whose coefficients
+        are this matrix and whose constants are COLUMN. Every variable
+        outside the (0-based) (row, col) PIVOTS is set to zero, or to its
+        value in the list SOLUTION if one is given.
+        """
+        solution = [0] * self._num_cols if solution is None else list(solution)
+        for row, col in reversed(pivots):
+            entries = self.contents[row]
+            solution[col] = (
+                column[row] - sum(
+                    entry * solution[j] for j, entry in entries.items() if j != col
+                )
+            ) / entries[col]
+        return solution
+
+class SparseRow:
+    """
+    Describes one row of a SparseMatrix, which can be read and written
+    like a dense list of LENGTH entries; writes go to the dictionary of
+    stored entries, and zeros are not stored.
+    """
+    __slots__ = ("entries", "length", "matrix")
+    def __init__(self, entries, length, matrix=None):
+        """
+        Creates a view of the row whose stored entries are the dictionary
+        ENTRIES.
+        MATRIX: The matrix whose _changed is called after every write
+        through this row, if any
+        """
+        self.entries = entries
+        self.length = length
+        self.matrix = matrix
+    def __len__(self):
+        return self.length
+    def __iter__(self):
+        entries = self.entries
+        return (entries.get(j, 0) for j in range(self.length))
+    def __repr__(self):
+        return repr(list(self))
+    def __eq__(self, other):
+        return list(self) == list(other)
+    def __getitem__(self, key):
+        """
+        Returns entry KEY of this row, or a list of the entries in KEY if
+        it is a slice.
+
+        >>> SparseMatrix([[1, 0, 3]])[0][::-1]
+        [3, 0, 1]
+        """
+        index = view_position(key, 0, self.length)
+        if isinstance(index, range):
+            return [self.entries.get(j, 0) for j in index]
+        return self.entries.get(index, 0)
+    def __setitem__(self, key, value):
+        """
+        Sets entry KEY of this row to VALUE, or, if KEY is a slice, sets
+        the entries in it to those of the sequence VALUE, which must have
+        the same length.
+
+        >>> mat = SparseMatrix([[1, 0, 3]])
+        >>> mat[0][1:] = [2, 0]
+        >>> mat.contents
+        [{0: 1, 1: 2}]
+        """
+        index = view_position(key, 0, self.length)
+        if isinstance(index, range):
+            value = list(value)
+            assert len(value) == len(index), "A row cannot change length."
+            pairs = zip(index, value)
+        else:
+            pairs = [(index, value)]
+        for j, entry in pairs:
+            if entry != 0:
+                self.entries[j] = entry
+            else:
+                self.entries.pop(j, None)
+        if self.matrix is not None:
+            self.matrix._changed()
@@ -0,0 +1,141 @@
+"""Solving many small, independent linear systems at once."""
+import collections
+import itertools
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from LinearSystem import LinearSystem
+from Matrix import Matrix
+
+def solve_one(aug_matrix, decimal_places=2):
+    """Returns a pair (num_solutions, solution) for the linear system
+    whose augmented matrix is AUG_MATRIX (a Matrix or a list of rows),
+    exactly as LinearSystem computes them.
+
+    >>> solve_one([[1, 1, 2], [1, 2, 3]])
+    (1, (1.0, 1.0))
+    >>> solve_one([[1, 1, 1], [2, 2, 2]])
+    (inf, None)
+    """
+    if not isinstance(aug_matrix, Matrix):
+        aug_matrix = Matrix([list(row) for row in aug_matrix])
+    system = LinearSystem(aug_matrix, decimal_places)
+    return system.num_solutions(), system.solution()
+
+def solve_chunk(aug_matrices, decimal_places=2):
+    """Returns the list of solve_one results for a list of augmented
+    matrices. This is the unit of work sent to each worker process.
+    """
+    return [solve_one(aug_matrix, decimal_places) for aug_matrix in aug_matrices]
+
+def solve_batch(aug_matrices, max_workers=None, chunk_size=256, decimal_places=2):
+    """Yields a pair (num_solutions, solution) for each augmented matrix
+    in the iterable AUG_MATRICES, in input order.
+
+    The matrices are grouped into chunks of CHUNK_SIZE and solved on a
+    pool of MAX_WORKERS processes (by default, one per CPU). Only a few
+    chunks per worker are in flight at a time, so AUG_MATRICES may be a
+    generator that is much larger than memory.
+
+    >>> systems = [[[1, 1, 2], [1, 2, 3]], [[2, 1, 1], [4, 2, 1.25]]] * 3
+    >>> [count for count, solution in solve_batch(systems, 2, chunk_size=2)]
+    [1, 0, 1, 0, 1, 0]
+    """
+    if max_workers is None:
+        max_workers = os.cpu_count() or 1
+    aug_matrices = iter(aug_matrices)
+    chunks = iter(lambda: list(itertools.islice(aug_matrices, chunk_size)), [])
+    with ProcessPoolExecutor(max_workers) as executor:
+        in_flight = collections.deque()
+        max_in_flight = 2 * max_workers
+        for chunk in chunks:
+            in_flight.append(executor.submit(solve_chunk, chunk, decimal_places))
+            if len(in_flight) >= max_in_flight:
+                yield from in_flight.popleft().result()
+        while in_flight:
+            yield from in_flight.popleft().result()
+
+def solve_stacked(aug_matrices, decimal_places=2):
+    """Solves a whole stack of same-sized systems at once with NumPy, with
+    no per-system Python objects. AUG_MATRICES is an array of shape
+    (batch, num_rows, num_vars + 1) holding one augmented matrix per
+    system. Each system is reduced with its own partial pivoting, and
+    entries that round to zero at DECIMAL_PLACES count as zero, with the
+    same rules as LinearSystem (and solve_one) for pivots and for the
+    constants left over below them. The systems are solved in floating
+    point, so DECIMAL_PLACES cannot be None.
+
+    Returns a pair (solutions, counts): an array of shape
+    (batch, num_vars) holding each unique solution (NaN where there is
+    none), and an array of shape (batch,) holding each system's number of
+    solutions (0, 1, or inf).
+
+    >>> solutions, counts = solve_stacked([
+    ...     [[1, 1, 2], [1, 2, 3]],
+    ...     [[2, 1, 1], [4, 2, 1.25]],
+    ...     [[1, 1, 1], [2, 2, 2]],
+    ... ])
+    >>> counts.tolist()
+    [1.0, 0.0, inf]
+    >>> solutions.round(2).tolist()[0]
+    [1.0, 1.0]
+    >>> systems = [[[1, -3, -2], [-2, 6, 4.02]], [[1, 1, 2], [1, 1, 2.007]]]
+    >>> solve_stacked(systems)[1].tolist() == [solve_one(system)[0] for system in systems]
+    True
+    """
+    assert decimal_places is not None, \
+        "solve_stacked works in floating point; use solve_batch to solve exactly."
+    import numpy
+    from NumpyMatrix import are_zero_constants
+    mats = numpy.array(aug_matrices, dtype=float)
+    batch, num_rows, num_cols = mats.shape
+    num_vars = num_cols - 1
+    systems = numpy.arange(batch)
+    rows = numpy.arange(num_rows)
+    pivot_rows = numpy.zeros(batch, dtype=int)
+    for col in range(num_vars):
+        # Step 1: Move the row with the largest entry in this column to
+        # the top of the rows that have no pivot yet, in every system
+        available = rows[numpy.newaxis, :] >= pivot_rows[:, numpy.newaxis]
+        magnitudes = numpy.where(available, numpy.abs(mats[:, :, col]), -1)
+        best = magnitudes.argmax(axis=1)
+        has_pivot = (
+            (pivot_rows < num_rows)
+            & (numpy.round(magnitudes[systems, best], decimal_places) > 0)
+        )
+        top = numpy.where(has_pivot, pivot_rows, best)
+        swapped = mats[systems, best]
+        mats[systems, best] = mats[systems, top]
+        mats[systems, top] = swapped
+        # Step 2: Create zeros below the pivot
+        pivot = mats[systems, top]
+        below = (rows[numpy.newaxis, :] > top[:, numpy.newaxis]) & has_pivot[:, numpy.newaxis]
+        factors = numpy.where(
+            below,
+            mats[:, :, col] / numpy.where(has_pivot, pivot[:, col], 1)[:, numpy.newaxis],
+            0
+        )
+        mats -= factors[:, :, numpy.newaxis] * pivot[:, numpy.newaxis, :]
+        # Step 3: Repeat on the rows below
+        pivot_rows += has_pivot
+    # A system is inconsistent if a row without a pivot has a nonzero constant
+    unpivoted = rows[numpy.newaxis, :] >= pivot_rows[:, numpy.newaxis]
+    inconsistent = (
+        unpivoted & ~are_zero_constants(mats[:, :, -1], decimal_places)
+    ).any(axis=1)
+    counts = numpy.where(
+        inconsistent, 0.0, numpy.where(pivot_rows < num_vars, numpy.inf, 1.0)
+    )
+    # Systems with a unique solution have their pivots on the diagonal
+    unique = counts == 1
+    solutions = numpy.full((batch, num_vars), numpy.nan)
+    if unique.any():
+        upper = mats[unique]
+        values = numpy.zeros((len(upper), num_vars))
+        for k in range(num_vars - 1, -1, -1):
+            values[:, k] = (
+                upper[:, k, -1]
+                - (upper[:, k, k + 1:num_vars] * values[:, k + 1:]).sum(axis=1)
+            ) / upper[:, k, k]
+        solutions[unique] = values
+    return solutions, counts
@@ -0,0 +1,110 @@
+"""Timing comparisons between the different ways of reducing a matrix.
+Run this module as a script to print a report.
+"""
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+from fractions import Fraction
+
+import products
+from Matrix import Matrix
+from RationalExpression import str_to_expression
+
+def time_call(function, *args, **kwargs):
+    """Returns the number of seconds taken by one call of FUNCTION."""
+    start = time.perf_counter()
+    function(*args, **kwargs)
+    return time.perf_counter() - start
+
+def random_integer_rows(num_rows, num_cols, bound=9, seed=0):
+    """Returns a list of NUM_ROWS rows of NUM_COLS random integers
+    between -BOUND and BOUND (inclusive).
+    """
+    rng = random.Random(seed)
+    return [
+        [rng.randint(-bound, bound) for j in range(num_cols)]
+        for i in range(num_rows)
+    ]
+
+def bench_exact_ref(sizes=(25, 50, 100, 200)):
+    """Prints the time taken to reduce square integer matrices of each of
+    the given SIZES in floating point, exactly with fractions, and
+    exactly with fraction-free integer elimination.
+    """
+    print("{:>6}{:>12}{:>12}{:>12}".format("size", "float", "fraction", "integer"))
+    for size in sizes:
+        rows = random_integer_rows(size, size)
+        float_time = time_call(Matrix([list(row) for row in rows]).ref)
+        fraction_time = time_call(
+            Matrix([[Fraction(entry) for entry in row] for row in rows]).ref,
+            None
+        )
+        integer_time = time_call(Matrix([list(row) for row in rows]).ref, None)
+        print("{:>6}{:>12.3f}{:>12.3f}{:>12.3f}".format(
+            size, float_time, fraction_time, integer_time
+        ))
+
+def bench_parallel_ref(size=2000, worker_counts=(1, 2, 4, 8, 16, 32)):
+    """Prints the time taken to reduce a random SIZE x (SIZE + 1) matrix
+    with NumpyMatrix, serially and with thread pools of each of the given
+    WORKER_COUNTS.
+    """
+    from NumpyMatrix import NumpyMatrix
+    rng = random.Random(0)
+    rows = [[rng.random() for j in range(size + 1)] for i in range(size)]
+    print("{:>8}{:>12}".format("workers", "seconds"))
+    print("{:>8}{:>12.3f}".format("serial", time_call(NumpyMatrix(rows).ref)))
+    for workers in worker_counts:
+        with ThreadPoolExecutor(workers) as executor:
+            print("{:>8}{:>12.3f}".format(
+                workers, time_call(NumpyMatrix(rows, executor).ref)
+            ))
+
+def bench_products(sizes=(128, 256, 512)):
+    """Prints the time taken to multiply two random square matrices of
+    each of the given SIZES with the blocked product, with Strassen's
+    algorithm, and with NumPy.
+    """
+    from NumpyMatrix import NumpyMatrix
+    rng = random.Random(0)
+    print("{:>6}{:>12}{:>12}{:>12}".format("size", "blocked", "strassen", "numpy"))
+    for size in sizes:
+        rows = [[rng.random() for j in range(size)] for i in range(size)]
+        mat = NumpyMatrix(rows)
+        print("{:>6}{:>12.3f}{:>12.3f}{:>12.3f}".format(
+            size,
+            time_call(products.multiply, rows, rows, size),
+            time_call(products.strassen, rows, rows),
+            time_call(mat.__matmul__, mat)
+        ))
+
+def bench_compiled(text="(x + y)^3/(1 + zz) - 2xy/(x - 3) + (x + y)^2", num_points=100000):
+    """Prints the time taken to evaluate the expression written in TEXT
+    at NUM_POINTS random points by walking the expression, by calling
+    its compiled function once per point, and with one vectorized call
+    (on NumPy arrays, if NumPy is installed).
+    """
+    expr = str_to_expression(text)
+    compiled = expr.compile()
+    rng = random.Random(0)
+    columns = {
+        name: [rng.random() for i in range(num_points)] for name in compiled.variables
+    }
+    points = [dict(zip(columns, values)) for values in zip(*columns.values())]
+    try:
+        import numpy
+        arrays = {name: numpy.array(column) for name, column in columns.items()}
+    except ImportError:
+        arrays = columns
+    print("{:>12}{:>12}{:>12}".format("walk", "compiled", "vectorized"))
+    print("{:>12.3f}{:>12.3f}{:>12.3f}".format(
+        time_call(lambda: [expr.evaluate(point) for point in points]),
+        time_call(lambda: [compiled(**point) for point in points]),
+        time_call(compiled.evaluate_many, arrays)
+    ))
+
+if __name__ == "__main__":
+    bench_exact_ref()
+    bench_parallel_ref()
+    bench_products()
+    bench_compiled()
@@ -1,9 +1,15 @@
+import math
+
 def round2(num, places=2):
     """
     Returns the number expressed as an int if the 
     result of the built-in round function would
     only have zeros after the decimal place.
+    If PLACES is None, or the number is infinite or NaN, the
+    number is returned unchanged.
     """
+    if places is None or not math.isfinite(num):
+        return num
     nearest_one = round(num)
     return (
         nearest_one
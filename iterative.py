@@ -0,0 +1,325 @@
+"""Solving square linear systems by iteration, using only products of
+the coefficient matrix with vectors.
+
+Each solver refines a guess until the residual b - Ax is small, so it
+never changes the matrix: a SparseMatrix stays sparse, and each step
+costs about one mat-vec product. Conjugate gradients needs a symmetric
+positive definite matrix; GMRES works for any nonsingular matrix; the
+Jacobi and Gauss-Seidel methods need a diagonally dominant one (or, for
+Gauss-Seidel, a symmetric positive definite one). Any of them can be
+given to a LinearSystem, which falls back to elimination when the
+iteration does not converge.
+"""
+import math
+import operator
+
+from SparseMatrix import SparseMatrix
+
+def dot(u, v):
+    """
+    Returns the dot product of the vectors U and V.
+
+    >>> dot([1, 2, 3], [4, 5, 6])
+    32
+    """
+    return sum(map(operator.mul, u, v))
+
+def norm(v):
+    """
+    Returns the Euclidean length of the vector V.
+    """
+    return math.sqrt(dot(v, v))
+
+def axpy(scale, u, v):
+    """
+    Returns the vector SCALE * U + V, as a list.
+
+    >>> axpy(2, [1, 2], [10, 20])
+    [12, 24]
+    """
+    return [scale * a + b for a, b in zip(u, v)]
+
+def diagonal(matrix):
+    """
+    Returns the list of entries on the diagonal of the square MATRIX.
+    """
+    return [matrix[i, i] for i in range(len(matrix))]
+
+def jacobi_preconditioner(matrix):
+    """
+    Returns the function that divides a vector by the diagonal of MATRIX
+    entry by entry, a cheap preconditioner for ConjugateGradient and
+    GMRES that helps when the rows of MATRIX have very different scales.
+    Returns None if a diagonal entry is zero.
+    """
+    inverses = []
+    for entry in diagonal(matrix):
+        if not entry:
+            return
+        inverses.append(1 / entry)
+    return lambda vector: list(map(operator.mul, inverses, vector))
+
+def _row_items(matrix, row):
+    """
+    Returns the pairs (col, entry) of the (0-based) ROW of MATRIX, only
+    for the stored entries if it is a SparseMatrix.
+    """
+    if isinstance(matrix, SparseMatrix):
+        return matrix.contents[row].items()
+    return enumerate(matrix[row])
+
+class IterativeSolver:
+    """
+    Describes a strategy for solving square systems Ax = b by iteration.
+    An iteration has converged when the length of the residual b - Ax is
+    at most TOLERANCE times the length of b.
+    """
+    def __init__(self, tolerance=1e-10, max_iterations=None):
+        """
+        TOLERANCE: The largest acceptable residual, relative to b
+        MAX_ITERATIONS: The number of iterations after which to give up,
+        or None for ten times the number of unknowns (but at least 100)
+        """
+        self.tolerance = tolerance
+        self.max_iterations = max_iterations
+        # The number of iterations used by the last call to solve
+        self.iterations = 0
+    def __repr__(self):
+        return "{}({}, {})".format(
+            type(self).__name__, self.tolerance, self.max_iterations
+        )
+    def solve(self, matrix, constants, start=None):
+        """
+        Iterates towards the solution of the system whose coefficient
+        matrix is the square MATRIX and whose right-hand side is the list
+        of CONSTANTS, beginning at the vector START (by default, zero).
+        Passing the solution of a similar system as START (a warm start)
+        usually saves many iterations.
+
+        Returns a pair (solution, converged): the last iterate, as a
+        tuple, and whether its residual is within the tolerance.
+        """
+        n = len(matrix)
+        assert matrix.num_cols() == n, "Iterative solvers need a square matrix."
+        assert len(constants) == n, "Expected {} constants, got {}.".format(n, len(constants))
+        constants = [float(entry) for entry in constants]
+        solution = [0.0] * n if start is None else [float(entry) for entry in start]
+        max_iterations = self.max_iterations
+        if max_iterations is None:
+            max_iterations = max(10 * n, 100)
+        self.iterations = 0
+        solution, converged = self._iterate(
+            matrix, constants, solution, self.tolerance * norm(constants), max_iterations
+        )
+        return tuple(solution), converged
+    def _iterate(self, matrix, constants, solution, target, max_iterations):
+        """
+        Refines SOLUTION until the length of its residual is at most
+        TARGET, for at most MAX_ITERATIONS iterations, counting them in
+        self.iterations. Returns a pair (solution, converged).
+        """
+        raise NotImplementedError
+
+class ConjugateGradient(IterativeSolver):
+    """
+    Describes the conjugate gradient method, for symmetric positive
+    definite matrices. In exact arithmetic it finds the solution of an
+    n-by-n system in at most n iterations; in practice far fewer are
+    needed when the eigenvalues are clustered.
+
+    >>> from Matrix import Matrix
+    >>> from formatting import roundall
+    >>> solution, converged = ConjugateGradient().solve(
+    ...     Matrix([[4, 1, 0], [1, 3, 1], [0, 1, 2]]), [6, 10, 8]
+    ... )
+    >>> roundall(solution), converged
+    ((1, 2, 3), True)
+    """
+    def __init__(self, tolerance=1e-10, max_iterations=None, preconditioner=None):
+        """
+        PRECONDITIONER: None, "jacobi" to divide by the diagonal, or a
+        function that maps a residual to an approximate solution of the
+        system whose right-hand side it is
+        """
+        super().__init__(tolerance, max_iterations)
+        self.preconditioner = preconditioner
+    def _iterate(self, matrix, constants, solution, target, max_iterations):
+        precondition = _preconditioner(self.preconditioner, matrix)
+        if precondition is None:
+            return solution, False
+        residual = axpy(-1, matrix.matvec(solution), constants)
+        if norm(residual) <= target:
+            return solution, True
+        preconditioned = precondition(residual)
+        direction = preconditioned
+        product = dot(residual, preconditioned)
+        while self.iterations < max_iterations:
+            self.iterations += 1
+            image = list(matrix.matvec(direction))
+            curvature = dot(direction, image)
+            if curvature <= 0:
+                # The matrix is not positive definite
+                return solution, False
+            step = product / curvature
+            solution = axpy(step, direction, solution)
+            residual = axpy(-step, image, residual)
+            if norm(residual) <= target:
+                return solution, True
+            preconditioned = precondition(residual)
+            product, previous = dot(residual, preconditioned), product
+            direction = axpy(product / previous, direction, preconditioned)
+        return solution, False
+
+class GMRES(IterativeSolver):
+    """
+    Describes the restarted generalized minimal residual method, for any
+    nonsingular matrix. Each iteration adds one vector to an orthonormal
+    basis of search directions, and the best solution in their span is
+    found by least squares; after RESTART iterations the basis is thrown
+    away, which bounds the memory and work per iteration.
+
+    >>> from Matrix import Matrix
+    >>> from formatting import roundall
+    >>> solution, converged = GMRES().solve(Matrix([[1, 2], [3, 1]]), [5, 5])
+    >>> roundall(solution), converged
+    ((1, 2), True)
+    """
+    def __init__(self, tolerance=1e-10, max_iterations=None, preconditioner=None, restart=30):
+        """
+        PRECONDITIONER: As for ConjugateGradient; it is applied on the
+        right, so the residual checked is that of the original system
+        RESTART: The number of basis vectors kept before restarting
+        """
+        super().__init__(tolerance, max_iterations)
+        self.preconditioner = preconditioner
+        self.restart = restart
+    def __repr__(self):
+        return "GMRES({}, {}, restart={})".format(
+            self.tolerance, self.max_iterations, self.restart
+        )
+    def _iterate(self, matrix, constants, solution, target, max_iterations):
+        precondition = _preconditioner(self.preconditioner, matrix)
+        if precondition is None:
+            return solution, False
+        while True:
+            residual = axpy(-1, matrix.matvec(solution), constants)
+            length = norm(residual)
+            if length <= target:
+                return solution, True
+            if self.iterations >= max_iterations:
+                return solution, False
+            basis = [[entry / length for entry in residual]]
+            # The columns of the Hessenberg matrix, reduced to upper
+            # triangular form by the Givens rotations (cosines, sines)
+            columns, cosines, sines = [], [], []
+            # The right-hand side of the least squares problem
+            rotated = [length]
+            for j in range(min(self.restart, len(constants))):
+                self.iterations += 1
+                vector = list(matrix.matvec(precondition(basis[j])))
+                column = []
+                for v in basis:
+                    coefficient = dot(vector, v)
+                    column.append(coefficient)
+                    vector = axpy(-coefficient, v, vector)
+                height = norm(vector)
+                for i in range(j):
+                    column[i], column[i + 1] = (
+                        cosines[i] * column[i] + sines[i] * column[i + 1],
+                        -sines[i] * column[i] + cosines[i] * column[i + 1]
+                    )
+                hypotenuse = math.hypot(column[j], height)
+                if not hypotenuse:
+                    break
+                cosines.append(column[j] / hypotenuse)
+                sines.append(height / hypotenuse)
+                column[j] = hypotenuse
+                columns.append(column)
+                rotated.append(-sines[j] * rotated[j])
+                rotated[j] *= cosines[j]
+                if abs(rotated[j + 1]) <= target or not height \
+                        or self.iterations >= max_iterations:
+                    break
+                basis.append([entry / height for entry in vector])
+            if not columns:
+                return solution, False
+            # Back substitution in the triangular least squares system
+            weights = [0.0] * len(columns)
+            for i in reversed(range(len(columns))):
+                weights[i] = (
+                    rotated[i]
+                    - sum(columns[k][i] * weights[k] for k in range(i + 1, len(columns)))
+                ) / columns[i][i]
+            update = [0.0] * len(constants)
+            for weight, v in zip(weights, basis):
+                update = axpy(weight, v, update)
+            solution = axpy(1, precondition(update), solution)
+
+class Jacobi(IterativeSolver):
+    """
+    Describes the Jacobi method: each iteration solves every equation for
+    its own unknown at once, using the previous values of the others.
+    It converges when the matrix is strictly diagonally dominant.
+
+    >>> from Matrix import Matrix
+    >>> from formatting import roundall
+    >>> solution, converged = Jacobi().solve(Matrix([[4, 1], [2, 5]]), [6, 12])
+    >>> roundall(solution), converged
+    ((1, 2), True)
+    """
+    def _iterate(self, matrix, constants, solution, target, max_iterations):
+        diagonal_entries = diagonal(matrix)
+        if not all(diagonal_entries):
+            return solution, False
+        while True:
+            residual = axpy(-1, matrix.matvec(solution), constants)
+            if norm(residual) <= target:
+                return solution, True
+            if self.iterations >= max_iterations:
+                return solution, False
+            self.iterations += 1
+            solution = [
+                entry + change / pivot
+                for entry, change, pivot in zip(solution, residual, diagonal_entries)
+            ]
+
+class GaussSeidel(IterativeSolver):
+    """
+    Describes the Gauss-Seidel method: like the Jacobi method, but each
+    unknown's new value is used as soon as it is known, which usually
+    halves the number of iterations. It converges when the matrix is
+    strictly diagonally dominant or symmetric positive definite.
+
+    >>> from Matrix import Matrix
+    >>> from formatting import roundall
+    >>> solution, converged = GaussSeidel().solve(Matrix([[4, 1], [2, 5]]), [6, 12])
+    >>> roundall(solution), converged
+    ((1, 2), True)
+    """
+    def _iterate(self, matrix, constants, solution, target, max_iterations):
+        diagonal_entries = diagonal(matrix)
+        if not all(diagonal_entries):
+            return solution, False
+        rows = [list(_row_items(matrix, i)) for i in range(len(matrix))]
+        while True:
+            residual = axpy(-1, matrix.matvec(solution), constants)
+            if norm(residual) <= target:
+                return solution, True
+            if self.iterations >= max_iterations:
+                return solution, False
+            self.iterations += 1
+            for i, row in enumerate(rows):
+                solution[i] += (
+                    constants[i] - sum(entry * solution[j] for j, entry in row)
+                ) / diagonal_entries[i]
+
+def _preconditioner(preconditioner, matrix):
+    """
+    Returns the function that applies PRECONDITIONER (as accepted by
+    ConjugateGradient) for MATRIX, or None if it cannot be built.
+    """
+    if preconditioner is None:
+        return list
+    if preconditioner == "jacobi":
+        return jacobi_preconditioner(matrix)
+    return preconditioner
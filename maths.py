@@ -1,4 +1,5 @@
 """Simple math operations involving basic Python types."""
+import re
 
 def get_prime_factors(n):
     """Returns the prime factors of some integer n in increasing order.
@@ -33,23 +34,18 @@ def get_math_tokens_from_string(string):
     >>> get_math_tokens_from_string("6xy")
     [6, 'x', 'y']
     """
-    tokens = list()
-    current = ""
-    for char in string:
-        if char.isdigit():
-            current += char
-        else:
-            if current:
-                tokens.append(int(current))
-                current = ""
-            tokens.append(char)
-    if current:
-        tokens.append(int(current))
-    return tokens
+    return [
+        int(token) if token[0].isdigit() else token
+        for token in re.findall(r"\d+|\D", string)
+    ]
 
 def product(iterable):
-    """Returns the product of one and all of the items in ITERABLE."""
+    """Returns the product of one and all of the items in ITERABLE.
+
+    >>> product([2, 3, 7])
+    42
+    """
     product = 1
     for item in iterable:
-        product += item
+        product *= item
     return product
\ No newline at end of file
@@ -0,0 +1,287 @@
+"""Saving matrices to files and loading them back.
+
+Each function takes either an open file object or a path. CSV files
+hold one row per line and keep integers and fractions exact. Binary
+files hold a small header followed by every entry as a little-endian
+64-bit float, row after row, and are read and written in bulk. Plain
+text, NumPy .npy and Matrix Market files can also be loaded, and load
+and load_system pick the right reader from a path's extension.
+"""
+import contextlib
+import csv
+import os
+import struct
+import sys
+from array import array
+from fractions import Fraction
+
+from ArrayMatrix import ArrayMatrix
+from LinearSystem import LinearSystem
+from Matrix import Matrix
+from SparseMatrix import SparseMatrix
+
+# Magic bytes, then the number of rows and of columns
+BINARY_HEADER = struct.Struct("<4sQQ")
+BINARY_MAGIC = b"LAM1"
+
+@contextlib.contextmanager
+def _opened(file, mode):
+    """
+    Yields FILE itself if it is a file object, or FILE opened in MODE if
+    it is a path, closing it afterwards.
+    """
+    if hasattr(file, "read") or hasattr(file, "write"):
+        yield file
+    else:
+        newline = None if "b" in mode else ""
+        with open(file, mode, newline=newline) as opened:
+            yield opened
+
+def parse_number(text):
+    """
+    Returns the int, Fraction or float written in TEXT.
+
+    >>> parse_number("3"), parse_number("-1/3"), parse_number("2.5e-1")
+    (3, Fraction(-1, 3), 0.25)
+    """
+    text = text.strip()
+    try:
+        return int(text)
+    except ValueError:
+        pass
+    if "/" in text:
+        return Fraction(text)
+    return float(text)
+
+def write_csv(matrix, file):
+    """
+    Writes the rows of MATRIX to FILE as comma-separated values. Floats
+    are written so that they read back unchanged, and fractions as p/q.
+
+    >>> import io
+    >>> out = io.StringIO()
+    >>> write_csv(Matrix([[1, 0.5], [Fraction(1, 3), -2]]), out)
+    >>> out.getvalue()
+    '1,0.5\\r\\n1/3,-2\\r\\n'
+    """
+    with _opened(file, "w") as out:
+        writer = csv.writer(out)
+        writer.writerows(
+            [str(entry) for entry in matrix[i]] for i in range(len(matrix))
+        )
+
+def read_csv(file, matrix_class=Matrix):
+    """
+    Returns a MATRIX_CLASS holding the comma-separated values in FILE, one
+    row per line. Blank lines are skipped.
+
+    >>> import io
+    >>> read_csv(io.StringIO("1,0.5\\n1/3,-2\\n")).contents
+    [[1, 0.5], [Fraction(1, 3), -2]]
+    """
+    with _opened(file, "r") as source:
+        rows = [[parse_number(entry) for entry in row] for row in csv.reader(source) if row]
+    return matrix_class(rows)
+
+def write_binary(matrix, file, chunk_rows=4096):
+    """
+    Writes MATRIX to the binary file FILE: a header holding the number of
+    rows and columns, then every entry as a float, CHUNK_ROWS rows at a
+    time.
+
+    >>> import io
+    >>> out = io.BytesIO()
+    >>> write_binary(Matrix([[1, 2], [3, 4]]), out)
+    >>> len(out.getvalue()) == BINARY_HEADER.size + 4 * 8
+    True
+    """
+    with _opened(file, "wb") as out:
+        out.write(BINARY_HEADER.pack(BINARY_MAGIC, len(matrix), matrix.num_cols()))
+        for start in range(0, len(matrix), chunk_rows):
+            chunk = array("d")
+            for i in range(start, min(start + chunk_rows, len(matrix))):
+                chunk.extend(float(entry) for entry in matrix[i])
+            if sys.byteorder == "big":
+                chunk.byteswap()
+            chunk.tofile(out)
+
+def read_binary(file, matrix_class=Matrix):
+    """
+    Returns a MATRIX_CLASS holding the matrix written to the binary file
+    FILE by write_binary. Entries are read in one bulk read; an
+    ArrayMatrix is built directly on the resulting buffer.
+
+    >>> import io
+    >>> out = io.BytesIO()
+    >>> write_binary(Matrix([[1, 2], [3, 4.5]]), out)
+    >>> read_binary(io.BytesIO(out.getvalue())).contents
+    [[1.0, 2.0], [3.0, 4.5]]
+    """
+    with _opened(file, "rb") as source:
+        magic, num_rows, num_cols = BINARY_HEADER.unpack(source.read(BINARY_HEADER.size))
+        assert magic == BINARY_MAGIC, "Not a binary matrix file."
+        entries = array("d")
+        entries.frombytes(source.read(8 * num_rows * num_cols))
+        assert len(entries) == num_rows * num_cols, "The binary matrix file is truncated."
+    if sys.byteorder == "big":
+        entries.byteswap()
+    return _from_entries(entries, num_rows, num_cols, matrix_class)
+
+def _from_entries(entries, num_rows, num_cols, matrix_class):
+    """
+    Returns a MATRIX_CLASS with NUM_ROWS rows and NUM_COLS columns
+    holding the array('d') ENTRIES, row after row.
+    """
+    if issubclass(matrix_class, ArrayMatrix) and num_cols:
+        return matrix_class(entries, num_cols)
+    return matrix_class([
+        entries[i * num_cols:(i + 1) * num_cols].tolist() for i in range(num_rows)
+    ])
+
+def read_text(file, matrix_class=Matrix, chunk_size=1 << 22):
+    """
+    Returns a MATRIX_CLASS holding the numbers in the text file FILE, one
+    row per line, separated by whitespace or commas. Every entry is read
+    as a float. The file is read CHUNK_SIZE characters at a time and each
+    chunk is converted line by line, so large files load quickly; use
+    read_csv to keep integers and fractions exact. Raises ValueError if a
+    row has a different number of entries from the first one.
+
+    >>> import io
+    >>> read_text(io.StringIO("1 2 3\\n4, 5, 6\\n\\n")).contents
+    [[1.0, 2.0, 3.0], [4.0, 5.0, 6.0]]
+    >>> read_text(io.StringIO("1 2 3\\n\\n4 5\\n6\\n"))
+    Traceback (most recent call last):
+    ...
+    ValueError: Line 3 has 2 entries; expected 3.
+    """
+    entries = array("d")
+    num_cols = None
+    line_number = 0
+    with _opened(file, "r") as source:
+        leftover = ""
+        while True:
+            chunk = source.read(chunk_size)
+            text = leftover + chunk
+            end = text.rfind("\n") + 1 if chunk else len(text)
+            text, leftover = text[:end], text[end:]
+            for line in text.replace(",", " ").splitlines():
+                line_number += 1
+                fields = line.split()
+                if not fields:
+                    continue
+                if num_cols is None:
+                    num_cols = len(fields)
+                elif len(fields) != num_cols:
+                    raise ValueError("Line {} has {} entries; expected {}.".format(
+                        line_number, len(fields), num_cols
+                    ))
+                entries.extend(map(float, fields))
+            if not chunk:
+                break
+    num_cols = num_cols or 0
+    num_rows = len(entries) // num_cols if num_cols else 0
+    return _from_entries(entries, num_rows, num_cols, matrix_class)
+
+def read_npy(path, matrix_class=Matrix, chunk_rows=4096):
+    """
+    Returns a MATRIX_CLASS holding the 2D array in the NumPy .npy file at
+    PATH. The file is memory-mapped and copied CHUNK_ROWS rows at a time;
+    a MappedMatrix is opened on the file itself without copying. Requires
+    NumPy.
+    """
+    import numpy
+    from MappedMatrix import MappedMatrix
+    if issubclass(matrix_class, MappedMatrix):
+        return matrix_class(path)
+    source = numpy.load(path, mmap_mode="r")
+    assert source.ndim == 2, "{} does not hold a 2D array.".format(path)
+    num_rows, num_cols = source.shape
+    entries = array("d")
+    for start in range(0, num_rows, chunk_rows):
+        entries.frombytes(
+            numpy.ascontiguousarray(source[start:start + chunk_rows], dtype=float).tobytes()
+        )
+    return _from_entries(entries, num_rows, num_cols, matrix_class)
+
+def read_matrix_market(file, matrix_class=SparseMatrix):
+    """
+    Returns a MATRIX_CLASS holding the real, integer or pattern matrix in
+    the Matrix Market file FILE, in either coordinate or array format.
+    Symmetric and skew-symmetric matrices are expanded.
+
+    >>> import io
+    >>> text = '''%%MatrixMarket matrix coordinate real symmetric
+    ... % a comment
+    ... 3 3 2
+    ... 1 1 4.0
+    ... 3 1 -1
+    ... '''
+    >>> read_matrix_market(io.StringIO(text)).contents
+    [{0: 4.0, 2: -1.0}, {}, {0: -1.0}]
+    """
+    with _opened(file, "r") as source:
+        header = source.readline().split()
+        assert len(header) == 5 and header[0].lower() == "%%matrixmarket" \
+            and header[1].lower() == "matrix", "Not a Matrix Market matrix file."
+        layout, field, symmetry = (word.lower() for word in header[2:])
+        assert field in ("real", "integer", "pattern"), \
+            "Unsupported Matrix Market field: {}".format(field)
+        line = source.readline()
+        while line.startswith("%") or not line.strip():
+            line = source.readline()
+        size = [int(word) for word in line.split()]
+        words = source.read().split()
+    num_rows, num_cols = size[0], size[1]
+    rows = [dict() for i in range(num_rows)]
+    if layout == "array":
+        # Entries are listed column by column (only those below the
+        # diagonal, or on it, if the matrix is symmetric)
+        skip = {"general": None, "skew-symmetric": 1}.get(symmetry, 0)
+        values = iter(map(float, words))
+        for j in range(num_cols):
+            for i in range(0 if skip is None else j + skip, num_rows):
+                rows[i][j] = next(values)
+    else:
+        width = 2 if field == "pattern" else 3
+        row_numbers = map(int, words[0::width])
+        col_numbers = map(int, words[1::width])
+        values = [1.0] * size[2] if field == "pattern" else map(float, words[2::width])
+        for i, j, value in zip(row_numbers, col_numbers, values):
+            rows[i - 1][j - 1] = value
+    if symmetry != "general":
+        sign = -1 if symmetry == "skew-symmetric" else 1
+        for i, row in enumerate(rows):
+            for j, value in list(row.items()):
+                if j < i:
+                    rows[j][i] = sign * value
+    matrix = SparseMatrix(rows, num_cols)
+    if issubclass(matrix_class, SparseMatrix):
+        return matrix
+    return matrix_class(matrix.to_dense().contents)
+
+# The reader used by load for each file name extension
+READERS = {
+    ".bin": read_binary,
+    ".csv": read_csv,
+    ".mtx": read_matrix_market,
+    ".npy": read_npy,
+}
+
+def load(path, matrix_class=None):
+    """
+    Returns the matrix stored at PATH, read with the reader in READERS
+    for its extension, or with read_text if there is none. The matrix is
+    a MATRIX_CLASS if one is given, and otherwise the reader's default.
+    """
+    reader = READERS.get(os.path.splitext(path)[1].lower(), read_text)
+    if matrix_class is None:
+        return reader(path)
+    return reader(path, matrix_class)
+
+def load_system(path, decimal_places=2, matrix_class=None):
+    """
+    Returns the LinearSystem whose augmented matrix is stored at PATH,
+    read as by load.
+    """
+    return LinearSystem(load(path, matrix_class), decimal_places)
@@ -0,0 +1,92 @@
+"""Multiplying and transposing matrices stored as lists of rows."""
+import operator
+
+def transpose(rows, num_cols):
+    """
+    Returns the transpose of the matrix with NUM_COLS columns whose rows
+    are ROWS, as a list of rows.
+
+    >>> transpose([[1, 2, 3], [4, 5, 6]], 3)
+    [[1, 4], [2, 5], [3, 6]]
+    """
+    if not rows:
+        return [[] for j in range(num_cols)]
+    return [list(col) for col in zip(*rows)]
+
+def multiply(a, b, num_cols, block_size=64):
+    """
+    Returns the product of the matrices whose rows are A and B, where B
+    has NUM_COLS columns, as a list of rows. The inner dimension is
+    worked through BLOCK_SIZE entries at a time, and within each step
+    the rows of A are taken BLOCK_SIZE at a time, so each piece of B's
+    columns is reused while it is still in cache.
+
+    >>> multiply([[1, 2], [3, 4]], [[5, 6], [7, 8]], 2)
+    [[19, 22], [43, 50]]
+    """
+    assert all(len(row) == len(b) for row in a), \
+        "Cannot multiply: A has rows of the wrong length for B's {} rows.".format(len(b))
+    b_cols = transpose(b, num_cols)
+    out = [[0] * num_cols for row in a]
+    for k in range(0, len(b), block_size):
+        cols = [col[k:k + block_size] for col in b_cols]
+        for i in range(0, len(a), block_size):
+            for row, out_row in zip(a[i:i + block_size], out[i:i + block_size]):
+                part = row[k:k + block_size]
+                for j, col in enumerate(cols):
+                    out_row[j] += sum(map(operator.mul, part, col))
+    return out
+
+def add(a, b):
+    """
+    Returns the entrywise sum of the matrices whose rows are A and B.
+    """
+    return [list(map(operator.add, row_a, row_b)) for row_a, row_b in zip(a, b)]
+
+def subtract(a, b):
+    """
+    Returns the entrywise difference A - B of the matrices whose rows are
+    A and B.
+    """
+    return [list(map(operator.sub, row_a, row_b)) for row_a, row_b in zip(a, b)]
+
+def strassen(a, b, leaf_size=128):
+    """
+    Returns the product of the square matrices whose rows are A and B
+    with Strassen's algorithm, which uses seven half-size products
+    instead of eight. Matrices of at most LEAF_SIZE rows are multiplied
+    directly, and a matrix with an odd number of rows is padded with
+    zeros.
+
+    >>> a = [[i + j for j in range(5)] for i in range(5)]
+    >>> strassen(a, a, 2) == multiply(a, a, 5)
+    True
+    """
+    n = len(a)
+    if n <= leaf_size:
+        return multiply(a, b, n, leaf_size)
+    if n % 2:
+        padded = strassen(
+            [row + [0] for row in a] + [[0] * (n + 1)],
+            [row + [0] for row in b] + [[0] * (n + 1)],
+            leaf_size
+        )
+        return [row[:n] for row in padded[:n]]
+    h = n // 2
+    a11, a12 = [row[:h] for row in a[:h]], [row[h:] for row in a[:h]]
+    a21, a22 = [row[:h] for row in a[h:]], [row[h:] for row in a[h:]]
+    b11, b12 = [row[:h] for row in b[:h]], [row[h:] for row in b[:h]]
+    b21, b22 = [row[:h] for row in b[h:]], [row[h:] for row in b[h:]]
+    m1 = strassen(add(a11, a22), add(b11, b22), leaf_size)
+    m2 = strassen(add(a21, a22), b11, leaf_size)
+    m3 = strassen(a11, subtract(b12, b22), leaf_size)
+    m4 = strassen(a22, subtract(b21, b11), leaf_size)
+    m5 = strassen(add(a11, a12), b22, leaf_size)
+    m6 = strassen(subtract(a21, a11), add(b11, b12), leaf_size)
+    m7 = strassen(subtract(a12, a22), add(b21, b22), leaf_size)
+    c11 = add(subtract(add(m1, m4), m5), m7)
+    c12 = add(m3, m5)
+    c21 = add(m2, m4)
+    c22 = add(add(subtract(m1, m2), m3), m6)
+    return [left + right for left, right in zip(c11, c12)] + \
+        [left + right for left, right in zip(c21, c22)]